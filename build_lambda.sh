@@ -28,6 +28,12 @@ mkdir -p "${PACKAGE_DIR}"
 echo "Copying Lambda source code..."
 cp "${LAMBDA_DIR}"/*.py "${PACKAGE_DIR}/"
 
+# Copy document summary index for two-stage retrieval (built by make build-document-index)
+if [ -f "${LAMBDA_DIR}/document_index.json" ]; then
+    echo "Copying document index..."
+    cp "${LAMBDA_DIR}/document_index.json" "${PACKAGE_DIR}/"
+fi
+
 # Install Python dependencies using uv with lock file (Linux-compatible)
 # Uses uv.lock for reproducible builds with exact dependency versions
 if [ -f "${SCRIPT_DIR}/uv.lock" ]; then
@@ -3,10 +3,17 @@
 import json
 import logging
 import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
 from typing import Any
 
 import boto3
+from bedrock_recorder import AGENT_RUNTIME_SERVICE, RUNTIME_SERVICE, maybe_record
 from botocore.exceptions import BotoCoreError, ClientError
+from document_router import build_source_filter, embed_text, get_document_index
+from schemas import Citation, QueryResponse
+from session_store import SessionState, Turn, get_session_store
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -15,12 +22,34 @@ logger.setLevel(logging.INFO)
 _bedrock_agent_runtime_client: Any | None = None
 _bedrock_runtime_client: Any | None = None
 
+# Session history limits (approximate tokens = whitespace-separated words)
+DEFAULT_SESSION_HISTORY_TOKEN_BUDGET = 800
+SESSION_RECENT_TURNS = 2
+SESSION_ANSWER_MAX_TOKENS = 150
+
+# Generation engines selectable via GENERATION_ENGINE
+ENGINE_RETRIEVE_INVOKE = "retrieve_invoke"
+ENGINE_RETRIEVE_AND_GENERATE = "retrieve_and_generate"
+GENERATION_ENGINES = (ENGINE_RETRIEVE_INVOKE, ENGINE_RETRIEVE_AND_GENERATE)
+
+# Generation settings shared by both engines
+MAX_RESULTS = 5
+MAX_TOKENS = 1024
+TEMPERATURE = 0.7
+CITATION_EXCERPT_MAX_CHARS = 300
+
+NO_CONTEXT_ANSWER = (
+    "I couldn't find relevant information in the knowledge base to answer your query."
+)
+
 
 def _get_bedrock_agent_runtime_client():
     """Get or create bedrock-agent-runtime client. Allows injection for testing."""
     global _bedrock_agent_runtime_client
     if _bedrock_agent_runtime_client is None:
-        _bedrock_agent_runtime_client = boto3.client("bedrock-agent-runtime")
+        _bedrock_agent_runtime_client = maybe_record(
+            boto3.client(AGENT_RUNTIME_SERVICE), AGENT_RUNTIME_SERVICE
+        )
     return _bedrock_agent_runtime_client
 
 
@@ -28,7 +57,7 @@ def _get_bedrock_runtime_client():
     """Get or create bedrock-runtime client. Allows injection for testing."""
     global _bedrock_runtime_client
     if _bedrock_runtime_client is None:
-        _bedrock_runtime_client = boto3.client("bedrock-runtime")
+        _bedrock_runtime_client = maybe_record(boto3.client(RUNTIME_SERVICE), RUNTIME_SERVICE)
     return _bedrock_runtime_client
 
 
@@ -42,19 +71,55 @@ def _get_bedrock_model_id() -> str:
     return os.getenv("BEDROCK_MODEL_ID", "")
 
 
-def generate_text_from_kb(query: str) -> str:
+def _get_generation_engine() -> str:
+    """Get generation engine from environment. Allows override for testing."""
+    return os.getenv("GENERATION_ENGINE", ENGINE_RETRIEVE_INVOKE).lower()
+
+
+def _get_document_routing_top_k() -> int:
+    """Get number of documents selected by document routing (0 disables it)."""
+    return int(os.getenv("DOCUMENT_ROUTING_TOP_K", "0"))
+
+
+def _get_session_history_token_budget() -> int:
+    """Get session history token budget from environment. Allows override for testing."""
+    return int(os.getenv("SESSION_HISTORY_TOKEN_BUDGET", str(DEFAULT_SESSION_HISTORY_TOKEN_BUDGET)))
+
+
+def _count_tokens(text: str) -> int:
+    """Approximate token count using whitespace-separated words."""
+    return len(text.split())
+
+
+def generate_text_from_kb(query: str, session_id: str | None = None) -> str:
     """
     Generate answer from Bedrock Knowledge Base using RAG with Nova models.
 
+    Returns only the answer text string. See generate_answer_from_kb for details.
+    """
+    return generate_answer_from_kb(query, session_id=session_id).answer
+
+
+def generate_answer_from_kb(query: str, session_id: str | None = None) -> QueryResponse:
+    """
+    Generate answer with citations from Bedrock Knowledge Base using RAG with Nova models.
+
     Supports Nova Pro (amazon.nova-pro-v1:0) and Nova Micro (amazon.nova-micro-v1:0).
-    Retrieves context from KB and invokes Nova model to generate answer.
-    Returns only the answer text string.
+    GENERATION_ENGINE selects how the answer is produced:
+    - retrieve_invoke (default): Retrieve context from KB, then invoke Nova model.
+    - retrieve_and_generate: Single RetrieveAndGenerate call, retrieval and
+      generation happen server-side.
+    When session_id is given, follow-up questions are rewritten into standalone
+    retrieval queries and the compacted session history is included in the prompt.
+    When DOCUMENT_ROUTING_TOP_K is set, chunk search is restricted to the top-K
+    documents selected by document routing.
     """
     if not query or not query.strip():
         raise ValueError("Query must be a non-empty string")
 
     bedrock_kb_id = _get_bedrock_kb_id()
     bedrock_model_id = _get_bedrock_model_id()
+    engine = _get_generation_engine()
 
     if not bedrock_kb_id:
         raise ValueError("BEDROCK_KB_ID is not configured")
@@ -62,28 +127,65 @@ def generate_text_from_kb(query: str) -> str:
     if not bedrock_model_id:
         raise ValueError("BEDROCK_MODEL_ID is not configured")
 
-    try:
-        logger.info(f"Retrieving context for query: {query[:50]}...")
-        retrieved_context = _retrieve_from_kb(query, bedrock_kb_id)
+    if engine not in GENERATION_ENGINES:
+        raise ValueError(f"Unsupported GENERATION_ENGINE: {engine}")
 
-        valid_context = [
-            result
-            for result in retrieved_context
-            if result.get("content", {}).get("text", "").strip()
-        ]
+    with _translate_bedrock_errors():
+        session = _load_session(session_id)
+        history = session.render() if session else ""
 
-        if not valid_context:
-            logger.warning(
-                f"No valid context retrieved (got {len(retrieved_context)} results, "
-                f"{len(valid_context)} with text)"
+        retrieval_query = query
+        if history:
+            retrieval_query = _rewrite_query(query, history, bedrock_model_id)
+
+        retrieval_filter = _route_documents(retrieval_query)
+
+        if engine == ENGINE_RETRIEVE_AND_GENERATE:
+            response = _retrieve_and_generate(
+                retrieval_query, bedrock_kb_id, bedrock_model_id, history, retrieval_filter
             )
-            return (
-                "I couldn't find relevant information in the knowledge base to answer your query."
+        else:
+            response = _retrieve_and_invoke(
+                query, retrieval_query, bedrock_kb_id, bedrock_model_id, history, retrieval_filter
             )
 
-        logger.info(f"Generating answer using foundation model: {bedrock_model_id}")
-        answer = _invoke_model_with_context(query, valid_context, bedrock_model_id)
-        return answer
+        if response is None:
+            response = QueryResponse(answer=NO_CONTEXT_ANSWER)
+
+        if session is not None:
+            _save_session(session_id, session, query, response.answer, bedrock_model_id)
+
+        return response
+
+
+def build_model_request_from_kb(query: str) -> dict[str, Any] | None:
+    """
+    Retrieve context from Knowledge Base and build the Nova request body without invoking it.
+
+    Used to prepare Bedrock batch inference records with the same prompt as online
+    queries. Returns None when no relevant context is found.
+    """
+    if not query or not query.strip():
+        raise ValueError("Query must be a non-empty string")
+
+    bedrock_kb_id = _get_bedrock_kb_id()
+    if not bedrock_kb_id:
+        raise ValueError("BEDROCK_KB_ID is not configured")
+
+    with _translate_bedrock_errors():
+        retrieval_filter = _route_documents(query)
+        retrieved_context = _retrieve_from_kb(query, bedrock_kb_id, MAX_RESULTS, retrieval_filter)
+        context_text = _join_context(retrieved_context)
+        if not context_text.strip():
+            return None
+        return build_nova_request_body(_build_prompt(query, context_text))
+
+
+@contextmanager
+def _translate_bedrock_errors() -> Iterator[None]:
+    """Translate Bedrock client and response format errors into RuntimeError."""
+    try:
+        yield
 
     except ClientError as e:
         error_code = e.response.get("Error", {}).get("Code", "Unknown")
@@ -100,18 +202,179 @@ def generate_text_from_kb(query: str) -> str:
         raise RuntimeError(f"Unexpected response format: {e}") from e
 
 
-def _retrieve_from_kb(query: str, bedrock_kb_id: str, max_results: int = 5) -> list[dict[str, Any]]:
-    """Retrieve relevant context chunks from Knowledge Base."""
+def _route_documents(query: str) -> dict[str, Any] | None:
+    """
+    Stage 1: select the top-K documents for the query. Returns a retrieval filter or None.
+
+    Routing only narrows the search, so any failure falls back to unfiltered retrieval.
+    """
+    top_k = _get_document_routing_top_k()
+    if top_k <= 0:
+        return None
+
+    document_index = get_document_index()
+    if document_index is None or len(document_index.documents) <= top_k:
+        return None
+
+    start = time.perf_counter()
+    try:
+        query_vector = embed_text(
+            _get_bedrock_runtime_client(), query, document_index.embedding_model_id
+        )
+    except (ClientError, BotoCoreError, KeyError, json.JSONDecodeError) as e:
+        logger.warning(f"Document routing failed, searching all documents: {e}")
+        return None
+
+    if len(query_vector) != document_index.dimension:
+        logger.warning(
+            f"Query embedding has {len(query_vector)} dimensions but the document index has "
+            f"{document_index.dimension}, searching all documents"
+        )
+        return None
+
+    source_uris = document_index.top_documents(query_vector, top_k)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    logger.info(
+        f"Stage 1 (document routing): selected {len(source_uris)} of "
+        f"{len(document_index.documents)} documents in {elapsed_ms:.1f} ms"
+    )
+    return build_source_filter(source_uris)
+
+
+def _build_retrieval_configuration(
+    max_results: int, retrieval_filter: dict[str, Any] | None
+) -> dict[str, Any]:
+    """Build the vector search configuration, optionally restricted by a metadata filter."""
+    vector_search: dict[str, Any] = {"numberOfResults": max_results}
+    if retrieval_filter:
+        vector_search["filter"] = retrieval_filter
+    return {"vectorSearchConfiguration": vector_search}
+
+
+def _retrieve_and_invoke(
+    query: str,
+    retrieval_query: str,
+    bedrock_kb_id: str,
+    bedrock_model_id: str,
+    history: str,
+    retrieval_filter: dict[str, Any] | None = None,
+) -> QueryResponse | None:
+    """Retrieve context from KB, then invoke the model. Returns None if nothing relevant."""
+    logger.info(f"Retrieving context for query: {retrieval_query[:50]}...")
+    retrieved_context = _retrieve_from_kb(
+        retrieval_query, bedrock_kb_id, MAX_RESULTS, retrieval_filter
+    )
+
+    valid_context = [
+        result for result in retrieved_context if result.get("content", {}).get("text", "").strip()
+    ]
+
+    if not valid_context:
+        logger.warning(
+            f"No valid context retrieved (got {len(retrieved_context)} results, "
+            f"{len(valid_context)} with text)"
+        )
+        return None
+
+    logger.info(f"Generating answer using foundation model: {bedrock_model_id}")
+    answer = _invoke_model_with_context(query, valid_context, bedrock_model_id, history)
+    return QueryResponse(answer=answer, citations=_build_citations(valid_context))
+
+
+def _retrieve_and_generate(
+    query: str,
+    bedrock_kb_id: str,
+    bedrock_model_id: str,
+    history: str,
+    retrieval_filter: dict[str, Any] | None = None,
+) -> QueryResponse:
+    """Retrieve and generate in a single RetrieveAndGenerate call."""
+    client = _get_bedrock_agent_runtime_client()
+    model_arn = _get_model_arn(bedrock_model_id, client.meta.region_name)
+
+    logger.info(f"Retrieving and generating answer using foundation model: {bedrock_model_id}")
+    start = time.perf_counter()
+    response = client.retrieve_and_generate(
+        input={"text": query},
+        retrieveAndGenerateConfiguration={
+            "type": "KNOWLEDGE_BASE",
+            "knowledgeBaseConfiguration": {
+                "knowledgeBaseId": bedrock_kb_id,
+                "modelArn": model_arn,
+                "retrievalConfiguration": _build_retrieval_configuration(
+                    MAX_RESULTS, retrieval_filter
+                ),
+                "generationConfiguration": {
+                    "promptTemplate": {
+                        # Bedrock substitutes the placeholders server-side
+                        "textPromptTemplate": _build_prompt("$query$", "$search_results$", history)
+                    },
+                    "inferenceConfig": {
+                        "textInferenceConfig": {"maxTokens": MAX_TOKENS, "temperature": TEMPERATURE}
+                    },
+                },
+            },
+        },
+    )
+
+    answer = response["output"]["text"]
+    if not answer or not answer.strip():
+        raise KeyError("Empty answer received from foundation model")
+
+    references = [
+        reference
+        for citation in response.get("citations", [])
+        for reference in citation.get("retrievedReferences", [])
+    ]
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    logger.info(
+        f"Stage 2 (RetrieveAndGenerate): {len(references)} retrieved references "
+        f"in {elapsed_ms:.1f} ms"
+    )
+    return QueryResponse(answer=answer.strip(), citations=_build_citations(references))
+
+
+def _get_model_arn(bedrock_model_id: str, region: str) -> str:
+    """Build foundation model ARN from model ID. ARNs are passed through unchanged."""
+    if bedrock_model_id.startswith("arn:"):
+        return bedrock_model_id
+    return f"arn:aws:bedrock:{region}::foundation-model/{bedrock_model_id}"
+
+
+def _build_citations(references: list[dict[str, Any]]) -> list[Citation]:
+    """Map retrieval results or retrieved references to citations."""
+    citations = []
+    for reference in references:
+        source_uri = reference.get("location", {}).get("s3Location", {}).get("uri")
+        if not source_uri:
+            continue
+        excerpt = reference.get("content", {}).get("text", "")[:CITATION_EXCERPT_MAX_CHARS]
+        citations.append(Citation(source_uri=source_uri, excerpt=excerpt or None))
+    return citations
+
+
+def _retrieve_from_kb(
+    query: str,
+    bedrock_kb_id: str,
+    max_results: int = 5,
+    retrieval_filter: dict[str, Any] | None = None,
+) -> list[dict[str, Any]]:
+    """Stage 2: retrieve relevant context chunks from Knowledge Base."""
     try:
         client = _get_bedrock_agent_runtime_client()
+        start = time.perf_counter()
         response = client.retrieve(
             knowledgeBaseId=bedrock_kb_id,
             retrievalQuery={"text": query},
-            retrievalConfiguration={"vectorSearchConfiguration": {"numberOfResults": max_results}},
+            retrievalConfiguration=_build_retrieval_configuration(max_results, retrieval_filter),
         )
+        elapsed_ms = (time.perf_counter() - start) * 1000
 
         results = response.get("retrievalResults", [])
-        logger.info(f"Retrieved {len(results)} results from Knowledge Base")
+        logger.info(
+            f"Stage 2 (chunk retrieval): retrieved {len(results)} results from Knowledge Base "
+            f"in {elapsed_ms:.1f} ms"
+        )
 
         if not results:
             logger.warning("Retrieval returned empty results list")
@@ -124,11 +387,96 @@ def _retrieve_from_kb(query: str, bedrock_kb_id: str, max_results: int = 5) -> l
         raise
 
 
+def _load_session(session_id: str | None) -> SessionState | None:
+    """Load session state, starting a new one for unknown IDs. Returns None if stateless."""
+    if not session_id:
+        return None
+    try:
+        session = get_session_store().get(session_id)
+    except (ClientError, BotoCoreError) as e:
+        # Answer without history rather than fail; the turn is not saved, so the
+        # stored history is not overwritten with this turn alone
+        logger.warning(f"Session load failed, answering without history: {e}")
+        return None
+    return session if session is not None else SessionState()
+
+
+def _save_session(
+    session_id: str, session: SessionState, query: str, answer: str, bedrock_model_id: str
+) -> None:
+    """Append the turn, compacting history once it exceeds the token budget."""
+    stored_answer = " ".join(answer.split()[:SESSION_ANSWER_MAX_TOKENS])
+    session.turns.append(Turn(question=query, answer=stored_answer))
+
+    if _count_tokens(session.render()) > _get_session_history_token_budget():
+        session = _compact_session(session, bedrock_model_id)
+
+    try:
+        get_session_store().put(session_id, session)
+    except (ClientError, BotoCoreError) as e:
+        # The answer is already generated; return it even though the turn is lost
+        logger.warning(f"Session save failed, turn not stored: {e}")
+
+
+def _compact_session(session: SessionState, bedrock_model_id: str) -> SessionState:
+    """Fold all but the most recent turns into the rolling summary."""
+    older = SessionState(summary=session.summary, turns=session.turns[:-SESSION_RECENT_TURNS])
+    recent = session.turns[-SESSION_RECENT_TURNS:]
+    if older.is_empty():
+        return session
+
+    prompt = f"""Summarize the following conversation in a few sentences.
+Keep names, numbers and topics needed to understand follow-up questions.
+
+Conversation:
+{older.render()}
+
+Summary:"""
+
+    logger.info(f"Compacting session history ({len(older.turns)} turns)")
+    try:
+        summary = _invoke_nova(prompt, bedrock_model_id, max_tokens=256, temperature=0.0)
+    except (ClientError, BotoCoreError, KeyError, json.JSONDecodeError) as e:
+        # The answer is already generated; keep the summary unchanged rather than fail
+        logger.warning(f"Session compaction failed, dropping older turns: {e}")
+        summary = session.summary
+
+    return SessionState(summary=summary, turns=recent)
+
+
+def _rewrite_query(query: str, history: str, bedrock_model_id: str) -> str:
+    """Rewrite a follow-up question into a standalone retrieval query."""
+    prompt = f"""Rewrite the follow-up question as a standalone question that can be understood
+without the conversation. Return only the rewritten question.
+
+Conversation:
+{history}
+
+Follow-up question: {query}
+
+Standalone question:"""
+
+    logger.info("Rewriting follow-up question into standalone query")
+    try:
+        rewritten = _invoke_nova(prompt, bedrock_model_id, max_tokens=128, temperature=0.0)
+    except (ClientError, BotoCoreError, KeyError, json.JSONDecodeError) as e:
+        # Rewriting only improves retrieval; fall back to the original question
+        logger.warning(f"Query rewrite failed, retrieving with the original question: {e}")
+        return query
+    return rewritten or query
+
+
 def _invoke_model_with_context(
-    query: str, context: list[dict[str, Any]], bedrock_model_id: str
+    query: str, context: list[dict[str, Any]], bedrock_model_id: str, history: str = ""
 ) -> str:
     """Invoke foundation model with query and retrieved context to generate answer."""
-    context_text = "\n\n".join(
+    prompt = _build_prompt(query, _join_context(context), history)
+    return _invoke_nova(prompt, bedrock_model_id)
+
+
+def _join_context(context: list[dict[str, Any]]) -> str:
+    """Join the text of retrieved chunks into a single context block."""
+    return "\n\n".join(
         [
             result.get("content", {}).get("text", "")
             for result in context
@@ -136,24 +484,30 @@ def _invoke_model_with_context(
         ]
     )
 
-    # Nova models (Pro and Micro) use messages API format with content as array
-    prompt = f"""Use the following pieces of context to answer the question.
+
+def _build_prompt(query: str, context_text: str, history: str = "") -> str:
+    """Build the answer prompt shared by both generation engines."""
+    conversation = f"Conversation so far:\n{history}\n\n" if history else ""
+
+    return f"""Use the following pieces of context to answer the question.
 If you don't know the answer, just say that you don't know, don't try to make up an answer.
 
-Context:
+{conversation}Context:
 {context_text}
 
 Question: {query}
 
 Answer:"""
 
-    body = {
-        "messages": [{"role": "user", "content": [{"text": prompt}]}],
-        "inferenceConfig": {
-            "maxTokens": 1024,
-            "temperature": 0.7,
-        },
-    }
+
+def _invoke_nova(
+    prompt: str,
+    bedrock_model_id: str,
+    max_tokens: int = MAX_TOKENS,
+    temperature: float = TEMPERATURE,
+) -> str:
+    """Invoke a Nova model with a single user prompt and return the stripped answer text."""
+    body = build_nova_request_body(prompt, max_tokens, temperature)
 
     logger.info(f"Invoking foundation model: {bedrock_model_id}")
     client = _get_bedrock_runtime_client()
@@ -166,7 +520,25 @@ Answer:"""
 
     response_body = json.loads(response["body"].read().decode("utf-8"))
     logger.debug(f"Response body keys: {list(response_body.keys())}")
+    return extract_nova_answer(response_body)
+
+
+def build_nova_request_body(
+    prompt: str, max_tokens: int = MAX_TOKENS, temperature: float = TEMPERATURE
+) -> dict[str, Any]:
+    """Build an InvokeModel request body for Nova models."""
+    # Nova models (Pro and Micro) use messages API format with content as array
+    return {
+        "messages": [{"role": "user", "content": [{"text": prompt}]}],
+        "inferenceConfig": {
+            "maxTokens": max_tokens,
+            "temperature": temperature,
+        },
+    }
+
 
+def extract_nova_answer(response_body: dict[str, Any]) -> str:
+    """Extract the stripped answer text from a Nova response body."""
     # Nova models (Pro and Micro) use output.message.content structure
     output = response_body.get("output", {})
     message = output.get("message", {})
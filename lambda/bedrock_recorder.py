@@ -0,0 +1,306 @@
+"""Record and replay Bedrock interactions.
+
+When BEDROCK_TRACE_DIR is set, bedrock_client wraps its boto3 clients in a
+RecordingClient that appends every Bedrock call (request parameters, response
+body and observed latency) to a compact JSONL trace file. Query text, prompts
+(which carry session history) and model-generated text are replaced by length
+markers; retrieved chunks are kept. ReplayClient serves a trace back
+deterministically, expanding markers to filler of the same length and optionally
+waiting for the recorded latencies, so performance tests can run
+production-shaped traffic offline.
+"""
+
+import io
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+from botocore.exceptions import ClientError
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+RECORDED_OPERATIONS = ("retrieve", "retrieve_and_generate", "invoke_model")
+AGENT_RUNTIME_SERVICE = "bedrock-agent-runtime"
+RUNTIME_SERVICE = "bedrock-runtime"
+
+_REDACTED_PATTERN = re.compile(r"<redacted:(\d+) chars>")
+
+# Module-level trace writer for runtime (can be overridden in tests)
+_trace_writer: Any | None = None
+
+
+class UnrecordedCallError(Exception):
+    """A replayed call has no recorded counterpart in the trace."""
+
+
+class TraceRecord(BaseModel):
+    """One recorded Bedrock call."""
+
+    service: str
+    operation: str
+    params: dict[str, Any]
+    response: dict[str, Any] | None = None
+    error: dict[str, str] | None = None
+    latency_ms: float
+
+
+def _redact(text: str) -> str:
+    """Replace text with a marker that keeps its length."""
+    return f"<redacted:{len(text)} chars>"
+
+
+def _expand(text: str) -> str:
+    """Replace a redaction marker with filler text of the original length."""
+    match = _REDACTED_PATTERN.fullmatch(text)
+    if not match:
+        return text
+    length = int(match.group(1))
+    return ("redacted " * (length // 9 + 1))[:length]
+
+
+def _map_text(container: dict[str, Any], key: str, transform: Callable[[str], str]) -> None:
+    if isinstance(container.get(key), str):
+        container[key] = transform(container[key])
+
+
+def redact_params(operation: str, params: dict[str, Any]) -> dict[str, Any]:
+    """Copy request parameters with query and prompt text redacted."""
+    redacted = json.loads(json.dumps(params, default=str))
+    if operation == "retrieve":
+        _map_text(redacted.get("retrievalQuery", {}), "text", _redact)
+    elif operation == "retrieve_and_generate":
+        _map_text(redacted.get("input", {}), "text", _redact)
+        # The prompt template embeds the session history, including earlier questions
+        kb_config = redacted.get("retrieveAndGenerateConfiguration", {}).get(
+            "knowledgeBaseConfiguration", {}
+        )
+        template = kb_config.get("generationConfiguration", {}).get("promptTemplate", {})
+        _map_text(template, "textPromptTemplate", _redact)
+    elif operation == "invoke_model":
+        body = json.loads(redacted.get("body") or "{}")
+        _map_text(body, "inputText", _redact)
+        for block in body.get("system", []):
+            _map_text(block, "text", _redact)
+        for message in body.get("messages", []):
+            for content in message.get("content", []):
+                _map_text(content, "text", _redact)
+        redacted["body"] = body
+    return redacted
+
+
+def map_generated_text(
+    operation: str, response: dict[str, Any], transform: Callable[[str], str]
+) -> dict[str, Any]:
+    """
+    Apply transform in place to model-generated text in a captured response.
+
+    Generated text can restate the user's question (query rewrites), summarize the
+    conversation (session compaction) or repeat it in the answer.
+    """
+    if operation == "invoke_model":
+        message = response.get("body", {}).get("output", {}).get("message", {})
+        for content in message.get("content", []):
+            _map_text(content, "text", transform)
+    elif operation == "retrieve_and_generate":
+        _map_text(response.get("output", {}), "text", transform)
+        for citation in response.get("citations", []):
+            part = citation.get("generatedResponsePart", {}).get("textResponsePart", {})
+            _map_text(part, "text", transform)
+    return response
+
+
+class TraceWriter:
+    """Appends trace records to one JSONL file per process."""
+
+    def __init__(self, trace_dir: Path):
+        trace_dir.mkdir(parents=True, exist_ok=True)
+        self.path = trace_dir / f"bedrock-trace-{os.getpid()}-{int(time.time() * 1000)}.jsonl"
+        self._lock = threading.Lock()
+
+    def write(self, record: TraceRecord) -> None:
+        line = record.model_dump_json(exclude_none=True)
+        with self._lock, self.path.open("a", encoding="utf-8") as trace_file:
+            trace_file.write(line + "\n")
+
+
+class RecordingClient:
+    """Wraps a boto3 Bedrock client and records every call to a trace."""
+
+    def __init__(
+        self,
+        client: Any,
+        service: str,
+        writer: TraceWriter,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self._client = client
+        self._service = service
+        self._writer = writer
+        self._clock = clock
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._client, name)
+        if name not in RECORDED_OPERATIONS:
+            return attribute
+
+        def call(**kwargs: Any) -> Any:
+            start = self._clock()
+            try:
+                response = attribute(**kwargs)
+            except ClientError as e:
+                self._record(name, kwargs, start, error=e.response.get("Error", {}))
+                raise
+
+            captured = dict(response)
+            captured.pop("ResponseMetadata", None)
+            if name == "invoke_model":
+                raw_body = response["body"].read()
+                captured["body"] = json.loads(raw_body)
+                response = {**response, "body": io.BytesIO(raw_body)}
+            self._record(name, kwargs, start, response=captured)
+            return response
+
+        return call
+
+    def _record(
+        self,
+        operation: str,
+        params: dict[str, Any],
+        start: float,
+        response: dict[str, Any] | None = None,
+        error: dict[str, str] | None = None,
+    ) -> None:
+        latency_ms = round((self._clock() - start) * 1000, 1)
+        if response is not None:
+            # Copy before redacting so the caller's response is left untouched
+            response = json.loads(json.dumps(response, default=str))
+            map_generated_text(operation, response, _redact)
+        self._writer.write(
+            TraceRecord(
+                service=self._service,
+                operation=operation,
+                params=redact_params(operation, params),
+                response=response,
+                error=error,
+                latency_ms=latency_ms,
+            )
+        )
+
+
+def maybe_record(client: Any, service: str) -> Any:
+    """Wrap the client in a RecordingClient when BEDROCK_TRACE_DIR is set."""
+    global _trace_writer
+    trace_dir = os.getenv("BEDROCK_TRACE_DIR", "")
+    if not trace_dir:
+        return client
+    if _trace_writer is None:
+        _trace_writer = TraceWriter(Path(trace_dir))
+        logger.info(f"Recording Bedrock interactions to {_trace_writer.path}")
+    return RecordingClient(client, service, _trace_writer)
+
+
+def load_trace(trace_path: Path) -> list[TraceRecord]:
+    """Load trace records from a JSONL file or a directory of them."""
+    paths = sorted(trace_path.glob("*.jsonl")) if trace_path.is_dir() else [trace_path]
+    records = []
+    for path in paths:
+        with path.open(encoding="utf-8") as trace_file:
+            records.extend(
+                TraceRecord.model_validate_json(line) for line in trace_file if line.strip()
+            )
+    if not records:
+        raise ValueError(f"No trace records found in {trace_path}")
+    return records
+
+
+class ReplayClient:
+    """
+    Serves recorded responses for one Bedrock service.
+
+    Calls are matched by operation (and modelId for invoke_model) and answered in
+    recorded order, cycling when a trace is exhausted; a call with no recorded match
+    raises UnrecordedCallError. With replay_timings, each call first sleeps for the
+    recorded latency multiplied by time_scale.
+    """
+
+    def __init__(
+        self,
+        records: list[TraceRecord],
+        service: str,
+        region_name: str = "us-east-1",
+        replay_timings: bool = False,
+        time_scale: float = 1.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.meta = SimpleNamespace(region_name=region_name)
+        self._replay_timings = replay_timings
+        self._time_scale = time_scale
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+        # Expand redacted text once so replayed responses have the recorded sizes
+        grouped: dict[tuple[str, str | None], list[TraceRecord]] = {}
+        for record in records:
+            if record.service == service:
+                if record.response is not None:
+                    response = json.loads(json.dumps(record.response))
+                    record = record.model_copy(
+                        update={"response": map_generated_text(record.operation, response, _expand)}
+                    )
+                grouped.setdefault(self._key(record.operation, record.params), []).append(record)
+        self._records = {key: itertools.cycle(group) for key, group in grouped.items()}
+
+    @staticmethod
+    def _key(operation: str, params: dict[str, Any]) -> tuple[str, str | None]:
+        return operation, params.get("modelId")
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in RECORDED_OPERATIONS:
+            raise AttributeError(name)
+        return lambda **kwargs: self._replay(name, kwargs)
+
+    def _replay(self, operation: str, params: dict[str, Any]) -> dict[str, Any]:
+        key = self._key(operation, params)
+        with self._lock:
+            if key not in self._records:
+                raise UnrecordedCallError(
+                    f"No recorded {operation} calls for {key[1] or 'this client'}; "
+                    "record a run that makes them and add it to the trace"
+                )
+            record = next(self._records[key])
+
+        if self._replay_timings:
+            self._sleep(record.latency_ms / 1000 * self._time_scale)
+        if record.error is not None:
+            raise ClientError({"Error": record.error}, operation)
+
+        response = dict(record.response or {})
+        if operation == "invoke_model":
+            response["body"] = io.BytesIO(json.dumps(response["body"]).encode("utf-8"))
+        return response
+
+
+def build_replay_clients(
+    records: list[TraceRecord], **options: Any
+) -> tuple[ReplayClient, ReplayClient]:
+    """Build replaying bedrock-agent-runtime and bedrock-runtime clients from one trace."""
+    return (
+        ReplayClient(records, AGENT_RUNTIME_SERVICE, **options),
+        ReplayClient(records, RUNTIME_SERVICE, **options),
+    )
+
+
+def p95(values: list[float]) -> float:
+    """95th percentile (nearest rank) of replayed latencies."""
+    ordered = sorted(values)
+    return ordered[max(int(round(len(ordered) * 0.95)) - 1, 0)]
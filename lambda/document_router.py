@@ -0,0 +1,119 @@
+"""Document-level routing for two-stage retrieval.
+
+Stage 1 picks the top-K documents by comparing the query embedding against
+per-document summary vectors built at ingestion time (tools/build_document_index.py).
+Stage 2, in bedrock_client, restricts chunk search to those documents with a
+metadata filter on the source URI.
+"""
+
+import json
+import logging
+import math
+import os
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+SOURCE_URI_METADATA_KEY = "x-amz-bedrock-kb-source-uri"
+BEDROCK_EMBEDDER = "bedrock"
+DEFAULT_DOCUMENT_INDEX_PATH = Path(__file__).parent / "document_index.json"
+
+# Module-level index for runtime (can be overridden in tests)
+_document_index: Any | None = None
+_document_index_loaded = False
+
+
+class DocumentVector(BaseModel):
+    """Summary vector for one source document."""
+
+    source_uri: str = Field(..., description="S3 URI as stored in the Knowledge Base metadata")
+    vector: list[float] = Field(..., description="Normalized document summary embedding")
+
+
+class DocumentIndex(BaseModel):
+    """Document summary vectors and the embedder that produced them."""
+
+    embedder: str = Field(..., description="bedrock, or a local stand-in used for dry runs")
+    embedding_model_id: str
+    dimension: int = Field(..., gt=0)
+    documents: list[DocumentVector]
+
+    def validation_error(self) -> str | None:
+        """Describe why the index cannot be used with Bedrock query embeddings, if it can't."""
+        if self.embedder != BEDROCK_EMBEDDER:
+            return f"index was built with the '{self.embedder}' embedder, not Bedrock"
+        for doc in self.documents:
+            if len(doc.vector) != self.dimension:
+                return (
+                    f"{doc.source_uri} has a {len(doc.vector)}-d vector, "
+                    f"index dimension is {self.dimension}"
+                )
+        return None
+
+    def top_documents(self, query_vector: list[float], top_k: int) -> list[str]:
+        """Return source URIs of the top_k documents by cosine similarity."""
+        query_norm = math.sqrt(sum(value * value for value in query_vector)) or 1.0
+        scored = [
+            (sum(a * b for a, b in zip(query_vector, doc.vector, strict=True)) / query_norm, doc)
+            for doc in self.documents
+        ]
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [doc.source_uri for _, doc in scored[:top_k]]
+
+
+def load_document_index(path: Path) -> DocumentIndex:
+    """Load a document index from JSON."""
+    return DocumentIndex.model_validate_json(path.read_text(encoding="utf-8"))
+
+
+def get_document_index() -> DocumentIndex | None:
+    """
+    Get the document index packaged with the function, loading it once.
+
+    DOCUMENT_INDEX_PATH overrides the default location next to this module.
+    Returns None when no usable index is available. Allows injection for testing.
+    """
+    global _document_index, _document_index_loaded
+    if not _document_index_loaded:
+        _document_index_loaded = True
+        path = Path(os.getenv("DOCUMENT_INDEX_PATH", str(DEFAULT_DOCUMENT_INDEX_PATH)))
+        if not path.exists():
+            logger.info(f"No document index at {path}, document routing disabled")
+            return None
+
+        try:
+            document_index = load_document_index(path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Invalid document index at {path}, document routing disabled: {e}")
+            return None
+
+        error = document_index.validation_error()
+        if error:
+            logger.warning(f"Unusable document index at {path}, document routing disabled: {error}")
+            return None
+
+        _document_index = document_index
+        logger.info(f"Loaded document index with {len(document_index.documents)} documents")
+    return _document_index
+
+
+def embed_text(client: Any, text: str, embedding_model_id: str) -> list[float]:
+    """Embed text with a Titan embedding model via bedrock-runtime."""
+    response = client.invoke_model(
+        modelId=embedding_model_id,
+        contentType="application/json",
+        accept="application/json",
+        body=json.dumps({"inputText": text}),
+    )
+    return json.loads(response["body"].read().decode("utf-8"))["embedding"]
+
+
+def build_source_filter(source_uris: list[str]) -> dict[str, Any]:
+    """Build a retrieval metadata filter restricting results to the given documents."""
+    if len(source_uris) == 1:
+        return {"equals": {"key": SOURCE_URI_METADATA_KEY, "value": source_uris[0]}}
+    return {"in": {"key": SOURCE_URI_METADATA_KEY, "value": source_uris}}
@@ -5,9 +5,9 @@ import json
 import logging
 from typing import Any
 
-from bedrock_client import generate_text_from_kb
+from bedrock_client import generate_answer_from_kb
 from pydantic import ValidationError
-from schemas import QueryRequest, QueryResponse
+from schemas import QueryRequest
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -81,11 +81,14 @@ def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
 
         query = request.query
         logger.info(f"Processing query: {query[:100]}...")
-        answer = generate_text_from_kb(query)
-
-        response = QueryResponse(answer=answer)
+        response = generate_answer_from_kb(query, session_id=request.session_id)
+        response = response.model_copy(update={"session_id": request.session_id})
         logger.info("Successfully generated answer")
-        return {"statusCode": 200, "headers": headers, "body": response.model_dump_json()}
+        return {
+            "statusCode": 200,
+            "headers": headers,
+            "body": response.model_dump_json(exclude_none=True),
+        }
 
     except ValueError as e:
         logger.error(f"Value error: {e}")
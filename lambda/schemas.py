@@ -7,9 +7,27 @@ class QueryRequest(BaseModel):
     """Request schema with query field for Knowledge Assistant queries."""
 
     query: str = Field(..., min_length=1, description="User's question or query string")
+    session_id: str | None = Field(
+        None,
+        min_length=1,
+        max_length=128,
+        pattern=r"^[A-Za-z0-9_-]+$",
+        description="Optional conversation ID; follow-up questions reuse its history",
+    )
+
+
+class Citation(BaseModel):
+    """Source document supporting a generated answer."""
+
+    source_uri: str = Field(..., description="S3 URI of the source document")
+    excerpt: str | None = Field(None, description="Excerpt of the retrieved chunk")
 
 
 class QueryResponse(BaseModel):
     """Response schema with answer field from Bedrock Knowledge Base."""
 
     answer: str = Field(..., min_length=1, description="Generated answer from knowledge base")
+    citations: list[Citation] = Field(
+        default_factory=list, description="Source documents used to generate the answer"
+    )
+    session_id: str | None = Field(None, description="Conversation ID echoed from the request")
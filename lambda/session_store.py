@@ -0,0 +1,142 @@
+"""Conversation session storage for multi-turn queries."""
+
+import logging
+import os
+import time
+from typing import Any, Protocol
+
+import boto3
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Sessions expire after a day of inactivity (DynamoDB TTL attribute)
+SESSION_TTL_SECONDS = 24 * 60 * 60
+
+# Module-level store for runtime (can be overridden in tests)
+_session_store: Any | None = None
+
+
+class Turn(BaseModel):
+    """A single question and answer exchange."""
+
+    question: str
+    answer: str
+
+
+class SessionState(BaseModel):
+    """Compact conversation history: rolling summary plus the most recent turns."""
+
+    summary: str = Field("", description="Rolling summary of compacted turns")
+    turns: list[Turn] = Field(default_factory=list, description="Recent uncompacted turns")
+
+    def is_empty(self) -> bool:
+        return not self.summary and not self.turns
+
+    def render(self) -> str:
+        """Render history as plain text for inclusion in model prompts."""
+        parts = []
+        if self.summary:
+            parts.append(f"Summary of earlier conversation: {self.summary}")
+        for turn in self.turns:
+            parts.append(f"User: {turn.question}\nAssistant: {turn.answer}")
+        return "\n\n".join(parts)
+
+
+class SessionStore(Protocol):
+    """Persists SessionState by session ID."""
+
+    def get(self, session_id: str) -> SessionState | None: ...
+
+    def put(self, session_id: str, state: SessionState) -> None: ...
+
+
+class InMemorySessionStore:
+    """Session store local to the Lambda execution environment."""
+
+    def __init__(self):
+        self._sessions: dict[str, str] = {}
+
+    def get(self, session_id: str) -> SessionState | None:
+        data = self._sessions.get(session_id)
+        return SessionState.model_validate_json(data) if data else None
+
+    def put(self, session_id: str, state: SessionState) -> None:
+        self._sessions[session_id] = state.model_dump_json()
+
+
+class KeyValueSessionStore:
+    """
+    Session store backed by a DynamoDB-compatible key-value client.
+
+    Items are keyed by ``session_id`` and carry the serialized state in ``state``
+    plus an ``expires_at`` epoch used as the table's TTL attribute.
+    """
+
+    def __init__(self, client: Any, table_name: str, ttl_seconds: int = SESSION_TTL_SECONDS):
+        self.client = client
+        self.table_name = table_name
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, session_id: str) -> SessionState | None:
+        response = self.client.get_item(
+            TableName=self.table_name,
+            Key={"session_id": {"S": session_id}},
+        )
+        item = response.get("Item")
+        if not item:
+            return None
+        return SessionState.model_validate_json(item["state"]["S"])
+
+    def put(self, session_id: str, state: SessionState) -> None:
+        self.client.put_item(
+            TableName=self.table_name,
+            Item={
+                "session_id": {"S": session_id},
+                "state": {"S": state.model_dump_json()},
+                "expires_at": {"N": str(int(time.time()) + self.ttl_seconds)},
+            },
+        )
+
+
+class LocalKeyValueClient:
+    """Local stand-in for the DynamoDB client, supporting get_item and put_item."""
+
+    def __init__(self):
+        self._items: dict[str, dict[str, Any]] = {}
+
+    def get_item(self, TableName: str, Key: dict[str, Any]) -> dict[str, Any]:
+        item = self._items.get(self._key(TableName, Key))
+        return {"Item": item} if item else {}
+
+    def put_item(self, TableName: str, Item: dict[str, Any]) -> dict[str, Any]:
+        self._items[self._key(TableName, Item)] = Item
+        return {}
+
+    @staticmethod
+    def _key(table_name: str, item: dict[str, Any]) -> str:
+        return f"{table_name}/{item['session_id']['S']}"
+
+
+def get_session_store():
+    """
+    Get or create the session store selected by SESSION_STORE.
+
+    ``memory`` (default) keeps sessions in the execution environment; ``dynamodb``
+    uses the table named by SESSION_TABLE_NAME. Allows injection for testing.
+    """
+    global _session_store
+    if _session_store is None:
+        backend = os.getenv("SESSION_STORE", "memory").lower()
+        if backend == "dynamodb":
+            table_name = os.getenv("SESSION_TABLE_NAME", "")
+            if not table_name:
+                raise ValueError("SESSION_TABLE_NAME is not configured")
+            _session_store = KeyValueSessionStore(boto3.client("dynamodb"), table_name)
+        elif backend == "memory":
+            _session_store = InMemorySessionStore()
+        else:
+            raise ValueError(f"Unsupported SESSION_STORE: {backend}")
+        logger.info(f"Using {backend} session store")
+    return _session_store
@@ -0,0 +1,21 @@
+# Conversation sessions for multi-turn queries (compact history, expires via TTL)
+resource "aws_dynamodb_table" "sessions" {
+  name         = "${var.project_name}-sessions"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "session_id"
+
+  attribute {
+    name = "session_id"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = {
+    Name        = "Knowledge Assistant Sessions"
+    Environment = "PoC"
+  }
+}
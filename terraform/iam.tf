@@ -22,7 +22,7 @@ resource "aws_iam_role" "lambda_role" {
 
 resource "aws_iam_policy" "lambda_policy" {
   name        = "${var.project_name}-lambda-policy"
-  description = "Least-privilege IAM policy: S3 read access, Bedrock invoke/retrieve"
+  description = "Least-privilege IAM policy: S3 read access, Bedrock invoke/retrieve, session table read/write"
 
   policy = jsonencode({
     Version = "2012-10-17"
@@ -44,7 +44,8 @@ resource "aws_iam_policy" "lambda_policy" {
           "bedrock:InvokeModel"
         ]
         Resource = [
-          "arn:aws:bedrock:${var.aws_region}::foundation-model/${var.bedrock_model_id}"
+          "arn:aws:bedrock:${var.aws_region}::foundation-model/${var.bedrock_model_id}",
+          local.bedrock_embedding_model_arn
         ]
       },
       {
@@ -57,6 +58,27 @@ resource "aws_iam_policy" "lambda_policy" {
         Resource = [
           aws_bedrockagent_knowledge_base.kb.arn
         ]
+      },
+      {
+        Sid    = "AllowBedrockRetrieveAndGenerate"
+        Effect = "Allow"
+        Action = [
+          "bedrock:RetrieveAndGenerate"
+        ]
+        # RetrieveAndGenerate does not support resource-level permissions;
+        # the KB and model are still scoped by the Retrieve and InvokeModel statements
+        Resource = ["*"]
+      },
+      {
+        Sid    = "AllowSessionTableAccess"
+        Effect = "Allow"
+        Action = [
+          "dynamodb:GetItem",
+          "dynamodb:PutItem"
+        ]
+        Resource = [
+          aws_dynamodb_table.sessions.arn
+        ]
       }
     ]
   })
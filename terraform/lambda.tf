@@ -9,9 +9,14 @@ resource "aws_lambda_function" "knowledge_assistant" {
 
   environment {
     variables = {
-      LOG_LEVEL        = "INFO"
-      BEDROCK_KB_ID    = aws_bedrockagent_knowledge_base.kb.id
-      BEDROCK_MODEL_ID = var.bedrock_model_id
+      LOG_LEVEL                    = "INFO"
+      BEDROCK_KB_ID                = aws_bedrockagent_knowledge_base.kb.id
+      BEDROCK_MODEL_ID             = var.bedrock_model_id
+      GENERATION_ENGINE            = var.generation_engine
+      SESSION_STORE                = "dynamodb"
+      SESSION_TABLE_NAME           = aws_dynamodb_table.sessions.name
+      SESSION_HISTORY_TOKEN_BUDGET = tostring(var.session_history_token_budget)
+      DOCUMENT_ROUTING_TOP_K       = tostring(var.document_routing_top_k)
     }
   }
 
@@ -108,6 +108,11 @@ output "bedrock_data_source_id" {
   value       = aws_bedrockagent_data_source.s3_documents.data_source_id
 }
 
+output "session_table_name" {
+  description = "Name of the DynamoDB table storing conversation sessions"
+  value       = aws_dynamodb_table.sessions.name
+}
+
 output "aws_region" {
   description = "AWS region where resources are deployed"
   value       = var.aws_region
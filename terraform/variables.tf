@@ -15,3 +15,31 @@ variable "bedrock_model_id" {
   type        = string
   default     = "amazon.nova-micro-v1:0"
 }
+
+variable "session_history_token_budget" {
+  description = "Approximate token budget for conversation history before it is compacted into a summary"
+  type        = number
+  default     = 800
+}
+
+variable "generation_engine" {
+  description = "Answer generation engine: retrieve_invoke (Retrieve + InvokeModel) or retrieve_and_generate (single RetrieveAndGenerate call)"
+  type        = string
+  default     = "retrieve_invoke"
+
+  validation {
+    condition     = contains(["retrieve_invoke", "retrieve_and_generate"], var.generation_engine)
+    error_message = "generation_engine must be either retrieve_invoke or retrieve_and_generate."
+  }
+}
+
+variable "document_routing_top_k" {
+  description = "Documents selected by document-level routing before chunk retrieval (0 disables routing; requires lambda/document_index.json)"
+  type        = number
+  default     = 0
+
+  validation {
+    condition     = var.document_routing_top_k >= 0
+    error_message = "document_routing_top_k must be zero or positive."
+  }
+}
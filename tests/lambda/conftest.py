@@ -50,12 +50,23 @@ def sample_query_request() -> dict[str, Any]:
 
 @pytest.fixture(autouse=True)
 def reset_bedrock_clients(monkeypatch: pytest.MonkeyPatch):
-    """Reset bedrock clients before each test to ensure clean state."""
+    """Reset bedrock clients, session store, document index and trace writer before each test."""
     import bedrock_client
+    import bedrock_recorder
+    import document_router
+    import session_store
 
     bedrock_client._bedrock_agent_runtime_client = None
     bedrock_client._bedrock_runtime_client = None
+    session_store._session_store = None
+    document_router._document_index = None
+    document_router._document_index_loaded = False
+    bedrock_recorder._trace_writer = None
     yield
     # Cleanup after test
     bedrock_client._bedrock_agent_runtime_client = None
     bedrock_client._bedrock_runtime_client = None
+    session_store._session_store = None
+    document_router._document_index = None
+    document_router._document_index_loaded = False
+    bedrock_recorder._trace_writer = None
@@ -4,7 +4,9 @@ import json
 from unittest.mock import MagicMock, patch
 
 import bedrock_client
+import document_router
 import pytest
+import session_store
 from botocore.exceptions import ClientError
 
 
@@ -99,3 +101,496 @@ def test_client_error_raises_runtime_error(monkeypatch):
 
     with pytest.raises(RuntimeError, match="Failed to generate answer"):
         bedrock_client.generate_text_from_kb("test query")
+
+
+def _nova_response(text):
+    """Build a mock invoke_model response carrying a Nova answer."""
+    body = MagicMock()
+    body.read.return_value = json.dumps(
+        {"output": {"message": {"content": [{"text": text}], "role": "assistant"}}}
+    ).encode("utf-8")
+    return {"body": body}
+
+
+@patch.dict(
+    "os.environ",
+    {"BEDROCK_KB_ID": "test-kb-id", "BEDROCK_MODEL_ID": "amazon.nova-micro-v1:0"},
+)
+def test_follow_up_question_is_rewritten_with_session(monkeypatch):
+    """Test that follow-ups in a session use a standalone retrieval query and history."""
+    mock_agent_client = MagicMock()
+    mock_agent_client.retrieve.return_value = {
+        "retrievalResults": [{"content": {"text": "Context about Lambda"}}]
+    }
+    mock_runtime_client = MagicMock()
+    mock_runtime_client.invoke_model.side_effect = [
+        _nova_response("Lambda is a compute service."),
+        _nova_response("How does AWS Lambda scale?"),
+        _nova_response("It scales per request."),
+    ]
+    monkeypatch.setattr(bedrock_client, "_bedrock_agent_runtime_client", mock_agent_client)
+    monkeypatch.setattr(bedrock_client, "_bedrock_runtime_client", mock_runtime_client)
+
+    bedrock_client.generate_text_from_kb("What is Lambda?", session_id="s1")
+    result = bedrock_client.generate_text_from_kb("How does it scale?", session_id="s1")
+
+    assert result == "It scales per request."
+    retrieval_queries = [
+        c.kwargs["retrievalQuery"]["text"] for c in mock_agent_client.retrieve.call_args_list
+    ]
+    assert retrieval_queries == ["What is Lambda?", "How does AWS Lambda scale?"]
+
+    answer_body = json.loads(mock_runtime_client.invoke_model.call_args.kwargs["body"])
+    prompt = answer_body["messages"][0]["content"][0]["text"]
+    assert "Conversation so far:" in prompt
+    assert "User: What is Lambda?" in prompt
+    assert "Question: How does it scale?" in prompt
+
+
+@patch.dict(
+    "os.environ",
+    {
+        "BEDROCK_KB_ID": "test-kb-id",
+        "BEDROCK_MODEL_ID": "amazon.nova-micro-v1:0",
+        "SESSION_HISTORY_TOKEN_BUDGET": "20",
+    },
+)
+def test_session_history_compacted_into_summary(monkeypatch):
+    """Test that history over the token budget is folded into a rolling summary."""
+    mock_agent_client = MagicMock()
+    mock_agent_client.retrieve.return_value = {
+        "retrievalResults": [{"content": {"text": "Context"}}]
+    }
+    mock_runtime_client = MagicMock()
+    mock_runtime_client.invoke_model.side_effect = lambda **kwargs: (
+        _nova_response("Earlier: serverless basics.")
+        if "Summarize the following conversation" in kwargs["body"]
+        else _nova_response("answer with several words in it")
+    )
+    monkeypatch.setattr(bedrock_client, "_bedrock_agent_runtime_client", mock_agent_client)
+    monkeypatch.setattr(bedrock_client, "_bedrock_runtime_client", mock_runtime_client)
+
+    for question in ["first question", "second question", "third question"]:
+        bedrock_client.generate_text_from_kb(question, session_id="s1")
+
+    state = session_store.get_session_store().get("s1")
+    assert state.summary == "Earlier: serverless basics."
+    assert [turn.question for turn in state.turns] == ["second question", "third question"]
+
+
+@patch.dict(
+    "os.environ",
+    {"BEDROCK_KB_ID": "test-kb-id", "BEDROCK_MODEL_ID": "amazon.nova-micro-v1:0"},
+)
+def test_compaction_failure_keeps_answer(monkeypatch):
+    """Test that a failed summary call drops older turns instead of failing the request."""
+    session_store.get_session_store().put(
+        "s1",
+        session_store.SessionState(
+            turns=[session_store.Turn(question=f"q{i}", answer="a " * 300) for i in range(3)]
+        ),
+    )
+    error = ClientError({"Error": {"Code": "ThrottlingException", "Message": "Slow"}}, "invoke")
+    mock_runtime_client = MagicMock()
+    mock_runtime_client.invoke_model.side_effect = [
+        _nova_response("standalone"),
+        _nova_response("final answer"),
+        error,
+    ]
+    mock_agent_client = MagicMock()
+    mock_agent_client.retrieve.return_value = {
+        "retrievalResults": [{"content": {"text": "Context"}}]
+    }
+    monkeypatch.setattr(bedrock_client, "_bedrock_agent_runtime_client", mock_agent_client)
+    monkeypatch.setattr(bedrock_client, "_bedrock_runtime_client", mock_runtime_client)
+
+    result = bedrock_client.generate_text_from_kb("q3", session_id="s1")
+
+    assert result == "final answer"
+    state = session_store.get_session_store().get("s1")
+    assert state.summary == ""
+    assert [turn.question for turn in state.turns] == ["q2", "q3"]
+
+
+@patch.dict(
+    "os.environ",
+    {"BEDROCK_KB_ID": "test-kb-id", "BEDROCK_MODEL_ID": "amazon.nova-micro-v1:0"},
+)
+def test_rewrite_failure_falls_back_to_original_question(monkeypatch):
+    """Test that a failed rewrite call retrieves with the original follow-up question."""
+    session_store.get_session_store().put(
+        "s1",
+        session_store.SessionState(
+            turns=[session_store.Turn(question="What is Lambda?", answer="A compute service.")]
+        ),
+    )
+    error = ClientError({"Error": {"Code": "ThrottlingException", "Message": "Slow"}}, "invoke")
+    mock_runtime_client = MagicMock()
+    mock_runtime_client.invoke_model.side_effect = [error, _nova_response("It scales per request.")]
+    mock_agent_client = MagicMock()
+    mock_agent_client.retrieve.return_value = {
+        "retrievalResults": [{"content": {"text": "Context"}}]
+    }
+    monkeypatch.setattr(bedrock_client, "_bedrock_agent_runtime_client", mock_agent_client)
+    monkeypatch.setattr(bedrock_client, "_bedrock_runtime_client", mock_runtime_client)
+
+    result = bedrock_client.generate_text_from_kb("How does it scale?", session_id="s1")
+
+    assert result == "It scales per request."
+    retrieval_query = mock_agent_client.retrieve.call_args.kwargs["retrievalQuery"]["text"]
+    assert retrieval_query == "How does it scale?"
+
+
+@patch.dict(
+    "os.environ",
+    {"BEDROCK_KB_ID": "test-kb-id", "BEDROCK_MODEL_ID": "amazon.nova-micro-v1:0"},
+)
+def test_no_context_turn_is_saved_to_session(monkeypatch):
+    """Test that a turn answered without context still enters the session history."""
+    mock_agent_client = MagicMock()
+    mock_agent_client.retrieve.return_value = {"retrievalResults": []}
+    monkeypatch.setattr(bedrock_client, "_bedrock_agent_runtime_client", mock_agent_client)
+    monkeypatch.setattr(bedrock_client, "_bedrock_runtime_client", MagicMock())
+
+    result = bedrock_client.generate_text_from_kb("What is Fargate?", session_id="s1")
+
+    assert result == bedrock_client.NO_CONTEXT_ANSWER
+    state = session_store.get_session_store().get("s1")
+    assert [turn.question for turn in state.turns] == ["What is Fargate?"]
+
+
+@patch.dict(
+    "os.environ",
+    {"BEDROCK_KB_ID": "test-kb-id", "BEDROCK_MODEL_ID": "amazon.nova-micro-v1:0"},
+)
+def test_session_load_failure_answers_without_history(monkeypatch):
+    """Test that an unavailable session table does not fail the request or overwrite history."""
+    failing_store = MagicMock()
+    failing_store.get.side_effect = ClientError(
+        {"Error": {"Code": "ProvisionedThroughputExceededException", "Message": "Slow"}},
+        "GetItem",
+    )
+    monkeypatch.setattr(session_store, "_session_store", failing_store)
+    mock_agent_client = MagicMock()
+    mock_agent_client.retrieve.return_value = {
+        "retrievalResults": [{"content": {"text": "Context"}}]
+    }
+    mock_runtime_client = MagicMock()
+    mock_runtime_client.invoke_model.return_value = _nova_response("It scales per request.")
+    monkeypatch.setattr(bedrock_client, "_bedrock_agent_runtime_client", mock_agent_client)
+    monkeypatch.setattr(bedrock_client, "_bedrock_runtime_client", mock_runtime_client)
+
+    result = bedrock_client.generate_text_from_kb("How does it scale?", session_id="s1")
+
+    assert result == "It scales per request."
+    # No rewrite call, and the turn is not saved over the unreadable history
+    assert mock_runtime_client.invoke_model.call_count == 1
+    failing_store.put.assert_not_called()
+
+
+@patch.dict(
+    "os.environ",
+    {"BEDROCK_KB_ID": "test-kb-id", "BEDROCK_MODEL_ID": "amazon.nova-micro-v1:0"},
+)
+def test_session_save_failure_still_returns_answer(monkeypatch):
+    """Test that a failed session write returns the already generated answer."""
+    failing_store = MagicMock()
+    failing_store.get.return_value = None
+    failing_store.put.side_effect = ClientError(
+        {"Error": {"Code": "InternalServerError", "Message": "Unavailable"}}, "PutItem"
+    )
+    monkeypatch.setattr(session_store, "_session_store", failing_store)
+    mock_agent_client = MagicMock()
+    mock_agent_client.retrieve.return_value = {
+        "retrievalResults": [{"content": {"text": "Context"}}]
+    }
+    mock_runtime_client = MagicMock()
+    mock_runtime_client.invoke_model.return_value = _nova_response("It scales per request.")
+    monkeypatch.setattr(bedrock_client, "_bedrock_agent_runtime_client", mock_agent_client)
+    monkeypatch.setattr(bedrock_client, "_bedrock_runtime_client", mock_runtime_client)
+
+    result = bedrock_client.generate_text_from_kb("How does it scale?", session_id="s1")
+
+    assert result == "It scales per request."
+    failing_store.put.assert_called_once()
+
+
+@patch.dict(
+    "os.environ",
+    {"BEDROCK_KB_ID": "test-kb-id", "BEDROCK_MODEL_ID": "amazon.nova-micro-v1:0"},
+)
+def test_retrieve_invoke_engine_returns_citations(monkeypatch):
+    """Test that retrieved chunk locations are mapped to citations."""
+    mock_agent_client = MagicMock()
+    mock_agent_client.retrieve.return_value = {
+        "retrievalResults": [
+            {
+                "content": {"text": "Context about Lambda"},
+                "location": {"type": "S3", "s3Location": {"uri": "s3://docs/lens.pdf"}},
+            }
+        ]
+    }
+    mock_runtime_client = MagicMock()
+    mock_runtime_client.invoke_model.return_value = _nova_response("Answer")
+    monkeypatch.setattr(bedrock_client, "_bedrock_agent_runtime_client", mock_agent_client)
+    monkeypatch.setattr(bedrock_client, "_bedrock_runtime_client", mock_runtime_client)
+
+    response = bedrock_client.generate_answer_from_kb("What is Lambda?")
+
+    assert response.answer == "Answer"
+    assert [(c.source_uri, c.excerpt) for c in response.citations] == [
+        ("s3://docs/lens.pdf", "Context about Lambda")
+    ]
+
+
+@patch.dict(
+    "os.environ",
+    {
+        "BEDROCK_KB_ID": "test-kb-id",
+        "BEDROCK_MODEL_ID": "amazon.nova-micro-v1:0",
+        "GENERATION_ENGINE": "retrieve_and_generate",
+    },
+)
+def test_retrieve_and_generate_engine(monkeypatch):
+    """Test that the RetrieveAndGenerate engine makes a single call and maps citations."""
+    mock_agent_client = MagicMock()
+    mock_agent_client.meta.region_name = "us-east-1"
+    mock_agent_client.retrieve_and_generate.return_value = {
+        "output": {"text": " Lambda scales per request. "},
+        "citations": [
+            {
+                "retrievedReferences": [
+                    {
+                        "content": {"text": "Lambda scales automatically"},
+                        "location": {"s3Location": {"uri": "s3://docs/lens.pdf"}},
+                    }
+                ]
+            }
+        ],
+    }
+    mock_runtime_client = MagicMock()
+    monkeypatch.setattr(bedrock_client, "_bedrock_agent_runtime_client", mock_agent_client)
+    monkeypatch.setattr(bedrock_client, "_bedrock_runtime_client", mock_runtime_client)
+
+    response = bedrock_client.generate_answer_from_kb("How does Lambda scale?")
+
+    assert response.answer == "Lambda scales per request."
+    assert response.citations[0].source_uri == "s3://docs/lens.pdf"
+    mock_agent_client.retrieve.assert_not_called()
+    mock_runtime_client.invoke_model.assert_not_called()
+
+    call_args = mock_agent_client.retrieve_and_generate.call_args
+    assert call_args.kwargs["input"] == {"text": "How does Lambda scale?"}
+    kb_config = call_args.kwargs["retrieveAndGenerateConfiguration"]["knowledgeBaseConfiguration"]
+    assert kb_config["knowledgeBaseId"] == "test-kb-id"
+    assert kb_config["modelArn"] == (
+        "arn:aws:bedrock:us-east-1::foundation-model/amazon.nova-micro-v1:0"
+    )
+    generation = kb_config["generationConfiguration"]
+    assert generation["inferenceConfig"]["textInferenceConfig"]["maxTokens"] == 1024
+    assert "$search_results$" in generation["promptTemplate"]["textPromptTemplate"]
+
+
+@patch.dict(
+    "os.environ",
+    {
+        "BEDROCK_KB_ID": "test-kb-id",
+        "BEDROCK_MODEL_ID": "amazon.nova-micro-v1:0",
+        "GENERATION_ENGINE": "retrieve_and_generate",
+    },
+)
+def test_retrieve_and_generate_client_error_raises_runtime_error(monkeypatch):
+    """Test that RetrieveAndGenerate errors are handled like the two-call engine."""
+    mock_agent_client = MagicMock()
+    mock_agent_client.meta.region_name = "us-east-1"
+    mock_agent_client.retrieve_and_generate.side_effect = ClientError(
+        {"Error": {"Code": "AccessDeniedException", "Message": "Denied"}},
+        "retrieve_and_generate",
+    )
+    monkeypatch.setattr(bedrock_client, "_bedrock_agent_runtime_client", mock_agent_client)
+
+    with pytest.raises(RuntimeError, match="Failed to generate answer: Denied"):
+        bedrock_client.generate_answer_from_kb("test query")
+
+
+@patch.dict(
+    "os.environ",
+    {
+        "BEDROCK_KB_ID": "test-kb-id",
+        "BEDROCK_MODEL_ID": "amazon.nova-micro-v1:0",
+        "GENERATION_ENGINE": "unknown",
+    },
+)
+def test_unsupported_engine_raises_error():
+    """Test that an unknown GENERATION_ENGINE raises ValueError."""
+    with pytest.raises(ValueError, match="Unsupported GENERATION_ENGINE"):
+        bedrock_client.generate_answer_from_kb("test query")
+
+
+@patch.dict("os.environ", {"BEDROCK_KB_ID": "test-kb-id"})
+def test_build_model_request_from_kb(monkeypatch):
+    """Test that batch request bodies use the online prompt without invoking the model."""
+    mock_agent_client = MagicMock()
+    mock_agent_client.retrieve.side_effect = [
+        {"retrievalResults": [{"content": {"text": "Context about Lambda"}}]},
+        {"retrievalResults": []},
+    ]
+    mock_runtime_client = MagicMock()
+    monkeypatch.setattr(bedrock_client, "_bedrock_agent_runtime_client", mock_agent_client)
+    monkeypatch.setattr(bedrock_client, "_bedrock_runtime_client", mock_runtime_client)
+
+    body = bedrock_client.build_model_request_from_kb("What is Lambda?")
+
+    prompt = body["messages"][0]["content"][0]["text"]
+    assert "Context about Lambda" in prompt
+    assert "Question: What is Lambda?" in prompt
+    assert body["inferenceConfig"]["maxTokens"] == 1024
+    assert bedrock_client.build_model_request_from_kb("Unknown?") is None
+    mock_runtime_client.invoke_model.assert_not_called()
+
+
+def _routing_index():
+    return document_router.DocumentIndex(
+        embedder="bedrock",
+        embedding_model_id="amazon.titan-embed-text-v1",
+        dimension=2,
+        documents=[
+            document_router.DocumentVector(source_uri="s3://docs/lambda.pdf", vector=[1.0, 0.0]),
+            document_router.DocumentVector(source_uri="s3://docs/dynamodb.pdf", vector=[0.0, 1.0]),
+        ],
+    )
+
+
+def _embedding_response(vector):
+    body = MagicMock()
+    body.read.return_value = json.dumps({"embedding": vector}).encode("utf-8")
+    return {"body": body}
+
+
+@patch.dict(
+    "os.environ",
+    {
+        "BEDROCK_KB_ID": "test-kb-id",
+        "BEDROCK_MODEL_ID": "amazon.nova-micro-v1:0",
+        "DOCUMENT_ROUTING_TOP_K": "1",
+    },
+)
+def test_document_routing_filters_chunk_retrieval(monkeypatch):
+    """Test that stage 1 routing restricts stage 2 retrieval to the top documents."""
+    monkeypatch.setattr(document_router, "_document_index", _routing_index())
+    monkeypatch.setattr(document_router, "_document_index_loaded", True)
+    mock_agent_client = MagicMock()
+    mock_agent_client.retrieve.return_value = {
+        "retrievalResults": [{"content": {"text": "DynamoDB scales on demand"}}]
+    }
+    mock_runtime_client = MagicMock()
+    mock_runtime_client.invoke_model.side_effect = [
+        _embedding_response([0.1, 0.9]),
+        _nova_response("On-demand capacity."),
+    ]
+    monkeypatch.setattr(bedrock_client, "_bedrock_agent_runtime_client", mock_agent_client)
+    monkeypatch.setattr(bedrock_client, "_bedrock_runtime_client", mock_runtime_client)
+
+    response = bedrock_client.generate_answer_from_kb("How does DynamoDB scale?")
+
+    assert response.answer == "On-demand capacity."
+    embed_call = mock_runtime_client.invoke_model.call_args_list[0].kwargs
+    assert embed_call["modelId"] == "amazon.titan-embed-text-v1"
+    vector_search = mock_agent_client.retrieve.call_args.kwargs["retrievalConfiguration"][
+        "vectorSearchConfiguration"
+    ]
+    assert vector_search["filter"] == {
+        "equals": {"key": "x-amz-bedrock-kb-source-uri", "value": "s3://docs/dynamodb.pdf"}
+    }
+
+
+@patch.dict(
+    "os.environ",
+    {
+        "BEDROCK_KB_ID": "test-kb-id",
+        "BEDROCK_MODEL_ID": "amazon.nova-micro-v1:0",
+        "GENERATION_ENGINE": "retrieve_and_generate",
+        "DOCUMENT_ROUTING_TOP_K": "1",
+    },
+)
+def test_document_routing_with_retrieve_and_generate(monkeypatch):
+    """Test that the routing filter is also applied to RetrieveAndGenerate."""
+    monkeypatch.setattr(document_router, "_document_index", _routing_index())
+    monkeypatch.setattr(document_router, "_document_index_loaded", True)
+    mock_agent_client = MagicMock()
+    mock_agent_client.meta.region_name = "us-east-1"
+    mock_agent_client.retrieve_and_generate.return_value = {"output": {"text": "Answer"}}
+    mock_runtime_client = MagicMock()
+    mock_runtime_client.invoke_model.return_value = _embedding_response([0.9, 0.1])
+    monkeypatch.setattr(bedrock_client, "_bedrock_agent_runtime_client", mock_agent_client)
+    monkeypatch.setattr(bedrock_client, "_bedrock_runtime_client", mock_runtime_client)
+
+    bedrock_client.generate_answer_from_kb("How does Lambda scale?")
+
+    kb_config = mock_agent_client.retrieve_and_generate.call_args.kwargs[
+        "retrieveAndGenerateConfiguration"
+    ]["knowledgeBaseConfiguration"]
+    assert kb_config["retrievalConfiguration"]["vectorSearchConfiguration"]["filter"] == {
+        "equals": {"key": "x-amz-bedrock-kb-source-uri", "value": "s3://docs/lambda.pdf"}
+    }
+
+
+@patch.dict(
+    "os.environ",
+    {
+        "BEDROCK_KB_ID": "test-kb-id",
+        "BEDROCK_MODEL_ID": "amazon.nova-micro-v1:0",
+        "DOCUMENT_ROUTING_TOP_K": "2",
+    },
+)
+def test_document_routing_skipped_for_small_index(monkeypatch):
+    """Test that routing is skipped when top-K already covers every document."""
+    monkeypatch.setattr(document_router, "_document_index", _routing_index())
+    monkeypatch.setattr(document_router, "_document_index_loaded", True)
+    mock_agent_client = MagicMock()
+    mock_agent_client.retrieve.return_value = {"retrievalResults": [{"content": {"text": "C"}}]}
+    mock_runtime_client = MagicMock()
+    mock_runtime_client.invoke_model.return_value = _nova_response("Answer")
+    monkeypatch.setattr(bedrock_client, "_bedrock_agent_runtime_client", mock_agent_client)
+    monkeypatch.setattr(bedrock_client, "_bedrock_runtime_client", mock_runtime_client)
+
+    bedrock_client.generate_answer_from_kb("How does Lambda scale?")
+
+    assert mock_runtime_client.invoke_model.call_count == 1
+    vector_search = mock_agent_client.retrieve.call_args.kwargs["retrievalConfiguration"][
+        "vectorSearchConfiguration"
+    ]
+    assert "filter" not in vector_search
+
+
+@pytest.mark.parametrize(
+    "embedding_result",
+    [
+        ClientError({"Error": {"Code": "AccessDeniedException", "Message": "Denied"}}, "invoke"),
+        _embedding_response([0.1, 0.2, 0.3]),
+    ],
+)
+@patch.dict(
+    "os.environ",
+    {
+        "BEDROCK_KB_ID": "test-kb-id",
+        "BEDROCK_MODEL_ID": "amazon.nova-micro-v1:0",
+        "DOCUMENT_ROUTING_TOP_K": "1",
+    },
+)
+def test_document_routing_failure_searches_all_documents(monkeypatch, embedding_result):
+    """Test that a failed or mismatched query embedding falls back to unfiltered retrieval."""
+    monkeypatch.setattr(document_router, "_document_index", _routing_index())
+    monkeypatch.setattr(document_router, "_document_index_loaded", True)
+    mock_agent_client = MagicMock()
+    mock_agent_client.retrieve.return_value = {"retrievalResults": [{"content": {"text": "C"}}]}
+    mock_runtime_client = MagicMock()
+    mock_runtime_client.invoke_model.side_effect = [embedding_result, _nova_response("Answer")]
+    monkeypatch.setattr(bedrock_client, "_bedrock_agent_runtime_client", mock_agent_client)
+    monkeypatch.setattr(bedrock_client, "_bedrock_runtime_client", mock_runtime_client)
+
+    assert bedrock_client.generate_text_from_kb("How does Lambda scale?") == "Answer"
+    vector_search = mock_agent_client.retrieve.call_args.kwargs["retrievalConfiguration"][
+        "vectorSearchConfiguration"
+    ]
+    assert "filter" not in vector_search
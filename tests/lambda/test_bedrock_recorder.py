@@ -0,0 +1,313 @@
+"""Unit tests for recording and replaying Bedrock interactions."""
+
+import io
+import json
+from unittest.mock import MagicMock, patch
+
+import bedrock_client
+import bedrock_recorder
+import pytest
+from bedrock_recorder import (
+    RecordingClient,
+    ReplayClient,
+    TraceRecord,
+    TraceWriter,
+    UnrecordedCallError,
+)
+from botocore.exceptions import ClientError
+
+
+def _ticking_clock(step: float = 0.25):
+    ticks = iter(range(1000))
+    return lambda: next(ticks) * step
+
+
+def test_redact_params_hides_query_and_prompt_text():
+    """Test that query and prompt text is replaced by length markers."""
+    retrieve = bedrock_recorder.redact_params(
+        "retrieve",
+        {"knowledgeBaseId": "kb", "retrievalQuery": {"text": "my secret question"}},
+    )
+    generate = bedrock_recorder.redact_params(
+        "retrieve_and_generate", {"input": {"text": "my secret question"}}
+    )
+    invoke = bedrock_recorder.redact_params(
+        "invoke_model",
+        {
+            "modelId": "amazon.nova-micro-v1:0",
+            "body": json.dumps(
+                {
+                    "messages": [{"role": "user", "content": [{"text": "Question: secret"}]}],
+                    "inferenceConfig": {"maxTokens": 1024},
+                }
+            ),
+        },
+    )
+    embed = bedrock_recorder.redact_params(
+        "invoke_model", {"modelId": "titan", "body": json.dumps({"inputText": "secret"})}
+    )
+    session_generate = bedrock_recorder.redact_params(
+        "retrieve_and_generate",
+        {
+            "input": {"text": "And my other one?"},
+            "retrieveAndGenerateConfiguration": {
+                "type": "KNOWLEDGE_BASE",
+                "knowledgeBaseConfiguration": {
+                    "knowledgeBaseId": "kb",
+                    "generationConfiguration": {
+                        "promptTemplate": {
+                            "textPromptTemplate": "User: is secret 123-45-6789 valid?\n$query$"
+                        }
+                    },
+                },
+            },
+        },
+    )
+
+    assert retrieve == {"knowledgeBaseId": "kb", "retrievalQuery": {"text": "<redacted:18 chars>"}}
+    assert generate["input"]["text"] == "<redacted:18 chars>"
+    assert invoke["body"]["messages"][0]["content"][0]["text"] == "<redacted:16 chars>"
+    assert invoke["body"]["inferenceConfig"] == {"maxTokens": 1024}
+    assert embed["body"] == {"inputText": "<redacted:6 chars>"}
+    kb_config = session_generate["retrieveAndGenerateConfiguration"]["knowledgeBaseConfiguration"]
+    assert kb_config["knowledgeBaseId"] == "kb"
+    assert kb_config["generationConfiguration"]["promptTemplate"]["textPromptTemplate"] == (
+        "<redacted:42 chars>"
+    )
+    assert "secret" not in json.dumps([retrieve, generate, invoke, embed, session_generate])
+
+
+def test_recording_client_writes_compact_trace(tmp_path):
+    """Test that calls are passed through and recorded with response and latency."""
+    client = MagicMock()
+    client.retrieve.return_value = {
+        "retrievalResults": [{"content": {"text": "Context"}}],
+        "ResponseMetadata": {"RequestId": "abc"},
+    }
+    client.invoke_model.return_value = {
+        "body": io.BytesIO(b'{"output": {"message": {"content": [{"text": "Answer"}]}}}'),
+        "contentType": "application/json",
+    }
+    writer = TraceWriter(tmp_path)
+    recording = RecordingClient(client, "bedrock-agent-runtime", writer, clock=_ticking_clock())
+
+    retrieve_response = recording.retrieve(
+        knowledgeBaseId="kb", retrievalQuery={"text": "question"}
+    )
+    invoke_response = recording.invoke_model(modelId="m", body=json.dumps({"messages": []}))
+
+    assert retrieve_response["retrievalResults"][0]["content"]["text"] == "Context"
+    assert json.loads(invoke_response["body"].read())["output"]["message"]["content"][0] == {
+        "text": "Answer"
+    }
+    records = bedrock_recorder.load_trace(tmp_path)
+    assert [r.operation for r in records] == ["retrieve", "invoke_model"]
+    assert records[0].latency_ms == 250.0
+    assert records[0].params["retrievalQuery"]["text"] == "<redacted:8 chars>"
+    assert "ResponseMetadata" not in records[0].response
+    assert records[1].response["body"]["output"]["message"]["content"][0]["text"] == (
+        "<redacted:6 chars>"
+    )
+    trace_text = writer.path.read_text(encoding="utf-8")
+    assert "question" not in trace_text
+    assert "Answer" not in trace_text
+
+
+def test_recording_client_records_errors(tmp_path):
+    """Test that Bedrock errors are recorded and re-raised."""
+    client = MagicMock()
+    client.retrieve.side_effect = ClientError(
+        {"Error": {"Code": "ThrottlingException", "Message": "Slow down"}}, "Retrieve"
+    )
+    recording = RecordingClient(client, "bedrock-agent-runtime", TraceWriter(tmp_path))
+
+    with pytest.raises(ClientError):
+        recording.retrieve(knowledgeBaseId="kb", retrievalQuery={"text": "q"})
+
+    record = bedrock_recorder.load_trace(tmp_path)[0]
+    assert record.error == {"Code": "ThrottlingException", "Message": "Slow down"}
+    assert record.response is None
+
+
+def test_replay_client_serves_records_in_order_and_cycles():
+    """Test that replay matches operation and model and cycles through recorded calls."""
+    records = [
+        TraceRecord(
+            service="bedrock-runtime",
+            operation="invoke_model",
+            params={"modelId": "nova"},
+            response={"body": {"answer": index}},
+            latency_ms=100.0 * (index + 1),
+        )
+        for index in range(2)
+    ]
+    records.append(
+        TraceRecord(
+            service="bedrock-runtime",
+            operation="invoke_model",
+            params={"modelId": "titan"},
+            response={"body": {"embedding": [0.1]}},
+            latency_ms=20.0,
+        )
+    )
+    sleeps = []
+    replay = ReplayClient(
+        records, "bedrock-runtime", replay_timings=True, time_scale=0.1, sleep=sleeps.append
+    )
+
+    answers = [
+        json.loads(replay.invoke_model(modelId="nova", body="{}")["body"].read())["answer"]
+        for _ in range(3)
+    ]
+    embedding = json.loads(replay.invoke_model(modelId="titan", body="{}")["body"].read())
+
+    assert answers == [0, 1, 0]
+    assert embedding == {"embedding": [0.1]}
+    assert sleeps == pytest.approx([0.01, 0.02, 0.01, 0.002])
+
+
+def test_replay_client_raises_recorded_errors_and_unknown_calls():
+    """Test that recorded errors are raised and unrecorded calls fail clearly."""
+    records = [
+        TraceRecord(
+            service="bedrock-agent-runtime",
+            operation="retrieve",
+            params={},
+            error={"Code": "ThrottlingException", "Message": "Slow down"},
+            latency_ms=5.0,
+        )
+    ]
+    replay = ReplayClient(records, "bedrock-agent-runtime")
+
+    with pytest.raises(ClientError, match="Slow down"):
+        replay.retrieve(knowledgeBaseId="kb")
+    with pytest.raises(UnrecordedCallError, match="No recorded retrieve_and_generate"):
+        replay.retrieve_and_generate(input={"text": "q"})
+
+
+def test_load_trace_rejects_empty_trace(tmp_path):
+    """Test that an empty trace directory is reported."""
+    with pytest.raises(ValueError, match="No trace records"):
+        bedrock_recorder.load_trace(tmp_path)
+
+
+@patch.dict(
+    "os.environ",
+    {"BEDROCK_KB_ID": "test-kb-id", "BEDROCK_MODEL_ID": "amazon.nova-micro-v1:0"},
+)
+def test_bedrock_client_records_when_trace_dir_set(tmp_path, monkeypatch):
+    """Test that BEDROCK_TRACE_DIR wraps the boto3 clients and replay reproduces the answer."""
+    monkeypatch.setenv("BEDROCK_TRACE_DIR", str(tmp_path))
+    mock_agent_client = MagicMock()
+    mock_agent_client.retrieve.return_value = {"retrievalResults": [{"content": {"text": "C"}}]}
+    mock_runtime_client = MagicMock()
+    mock_runtime_client.invoke_model.return_value = {
+        "body": io.BytesIO(b'{"output": {"message": {"content": [{"text": "Recorded"}]}}}')
+    }
+    clients = {"bedrock-agent-runtime": mock_agent_client, "bedrock-runtime": mock_runtime_client}
+
+    with patch("bedrock_client.boto3.client", side_effect=clients.__getitem__):
+        recorded_answer = bedrock_client.generate_text_from_kb("What is Lambda?")
+
+    records = bedrock_recorder.load_trace(tmp_path)
+    assert [r.operation for r in records] == ["retrieve", "invoke_model"]
+
+    agent_client, runtime_client = bedrock_recorder.build_replay_clients(records)
+    monkeypatch.setattr(bedrock_client, "_bedrock_agent_runtime_client", agent_client)
+    monkeypatch.setattr(bedrock_client, "_bedrock_runtime_client", runtime_client)
+
+    assert recorded_answer == "Recorded"
+    assert bedrock_client.generate_text_from_kb("What is Lambda?") == "redacted"
+
+
+@patch.dict(
+    "os.environ",
+    {
+        "BEDROCK_KB_ID": "test-kb-id",
+        "BEDROCK_MODEL_ID": "amazon.nova-micro-v1:0",
+        "GENERATION_ENGINE": "retrieve_and_generate",
+    },
+)
+def test_session_history_is_not_recorded(tmp_path, monkeypatch):
+    """Test that earlier questions never reach the trace via prompts, rewrites or answers."""
+    monkeypatch.setenv("BEDROCK_TRACE_DIR", str(tmp_path))
+    mock_agent_client = MagicMock()
+    mock_agent_client.meta.region_name = "us-east-1"
+    mock_agent_client.retrieve_and_generate.side_effect = [
+        {"output": {"text": "Your number 123-45-6789 is noted."}},
+        {
+            "output": {"text": "Follow-up answer about 123-45-6789."},
+            "citations": [
+                {
+                    "generatedResponsePart": {"textResponsePart": {"text": "about 123-45-6789"}},
+                    "retrievedReferences": [],
+                }
+            ],
+        },
+    ]
+    mock_runtime_client = MagicMock()
+    mock_runtime_client.invoke_model.return_value = {
+        "body": io.BytesIO(
+            b'{"output": {"message": {"content": [{"text": "Is 123-45-6789 valid?"}]}}}'
+        )
+    }
+    clients = {"bedrock-agent-runtime": mock_agent_client, "bedrock-runtime": mock_runtime_client}
+
+    with patch("bedrock_client.boto3.client", side_effect=clients.__getitem__):
+        bedrock_client.generate_text_from_kb("Is 123-45-6789 valid?", session_id="s1")
+        bedrock_client.generate_text_from_kb("What about it?", session_id="s1")
+
+    records = bedrock_recorder.load_trace(tmp_path)
+    assert [r.operation for r in records] == [
+        "retrieve_and_generate",
+        "invoke_model",
+        "retrieve_and_generate",
+    ]
+    assert "123-45-6789" not in bedrock_recorder._trace_writer.path.read_text(encoding="utf-8")
+
+
+def test_replay_expands_redacted_text_to_recorded_length():
+    """Test that replayed generated text has the recorded length."""
+    records = [
+        TraceRecord(
+            service="bedrock-agent-runtime",
+            operation="retrieve_and_generate",
+            params={},
+            response={"output": {"text": "<redacted:20 chars>"}},
+            latency_ms=1.0,
+        )
+    ]
+    replay = ReplayClient(records, "bedrock-agent-runtime")
+
+    text = replay.retrieve_and_generate(input={"text": "q"})["output"]["text"]
+
+    assert len(text) == 20
+    assert records[0].response["output"]["text"] == "<redacted:20 chars>"
+
+
+def test_unrecorded_call_is_not_reported_as_response_format_error(monkeypatch):
+    """Test that a trace missing an engine's calls fails with a clear replay error."""
+    monkeypatch.setenv("BEDROCK_KB_ID", "kb")
+    monkeypatch.setenv("BEDROCK_MODEL_ID", "amazon.nova-micro-v1:0")
+    monkeypatch.setenv("GENERATION_ENGINE", bedrock_client.ENGINE_RETRIEVE_AND_GENERATE)
+    records = [
+        TraceRecord(
+            service="bedrock-agent-runtime",
+            operation="retrieve",
+            params={},
+            response={"retrievalResults": []},
+            latency_ms=1.0,
+        )
+    ]
+    agent_client, runtime_client = bedrock_recorder.build_replay_clients(records)
+    monkeypatch.setattr(bedrock_client, "_bedrock_agent_runtime_client", agent_client)
+    monkeypatch.setattr(bedrock_client, "_bedrock_runtime_client", runtime_client)
+
+    with pytest.raises(UnrecordedCallError, match="No recorded retrieve_and_generate"):
+        bedrock_client.generate_answer_from_kb("q")
+
+
+def test_p95_uses_nearest_rank():
+    """Test the p95 helper shared by the perf suite and the engine benchmark."""
+    assert bedrock_recorder.p95([3.0, 1.0, 2.0]) == 3.0
+    assert bedrock_recorder.p95([float(i) for i in range(1, 101)]) == 95.0
@@ -0,0 +1,101 @@
+"""Unit tests for document-level routing."""
+
+import io
+import json
+from unittest.mock import MagicMock
+
+import document_router
+import pytest
+from document_router import DocumentIndex, DocumentVector
+
+
+def _index() -> DocumentIndex:
+    return DocumentIndex(
+        embedder="bedrock",
+        embedding_model_id="amazon.titan-embed-text-v1",
+        dimension=3,
+        documents=[
+            DocumentVector(source_uri="s3://docs/lambda.pdf", vector=[1.0, 0.0, 0.0]),
+            DocumentVector(source_uri="s3://docs/dynamodb.pdf", vector=[0.0, 1.0, 0.0]),
+            DocumentVector(source_uri="s3://docs/apigw.pdf", vector=[0.6, 0.0, 0.8]),
+        ],
+    )
+
+
+def test_top_documents_orders_by_similarity():
+    """Test that documents are ranked by cosine similarity to the query."""
+    assert _index().top_documents([0.9, 0.1, 0.4], top_k=2) == [
+        "s3://docs/lambda.pdf",
+        "s3://docs/apigw.pdf",
+    ]
+
+
+def test_build_source_filter():
+    """Test that one document uses equals and several use an in filter."""
+    assert document_router.build_source_filter(["s3://docs/a.pdf"]) == {
+        "equals": {"key": "x-amz-bedrock-kb-source-uri", "value": "s3://docs/a.pdf"}
+    }
+    assert document_router.build_source_filter(["s3://docs/a.pdf", "s3://docs/b.pdf"]) == {
+        "in": {
+            "key": "x-amz-bedrock-kb-source-uri",
+            "value": ["s3://docs/a.pdf", "s3://docs/b.pdf"],
+        }
+    }
+
+
+def test_embed_text_calls_titan():
+    """Test that the query is embedded with the index's embedding model."""
+    client = MagicMock()
+    client.invoke_model.return_value = {
+        "body": io.BytesIO(json.dumps({"embedding": [0.1, 0.2]}).encode("utf-8"))
+    }
+
+    vector = document_router.embed_text(client, "cold starts", "amazon.titan-embed-text-v1")
+
+    assert vector == [0.1, 0.2]
+    call_args = client.invoke_model.call_args.kwargs
+    assert call_args["modelId"] == "amazon.titan-embed-text-v1"
+    assert json.loads(call_args["body"]) == {"inputText": "cold starts"}
+
+
+def test_get_document_index_loads_once(tmp_path, monkeypatch):
+    """Test that the packaged index is loaded from DOCUMENT_INDEX_PATH and cached."""
+    index_path = tmp_path / "document_index.json"
+    index_path.write_text(_index().model_dump_json(), encoding="utf-8")
+    monkeypatch.setenv("DOCUMENT_INDEX_PATH", str(index_path))
+
+    index = document_router.get_document_index()
+    index_path.unlink()
+
+    assert len(index.documents) == 3
+    assert document_router.get_document_index() is index
+
+
+def test_get_document_index_missing_file(tmp_path, monkeypatch):
+    """Test that routing is disabled when no index is packaged."""
+    monkeypatch.setenv("DOCUMENT_INDEX_PATH", str(tmp_path / "missing.json"))
+
+    assert document_router.get_document_index() is None
+
+
+@pytest.mark.parametrize(
+    ("index_json", "reason"),
+    [
+        ('{"documents": []}', "Invalid document index"),
+        (
+            _index().model_copy(update={"embedder": "hashing"}).model_dump_json(),
+            "'hashing' embedder",
+        ),
+        (_index().model_copy(update={"dimension": 256}).model_dump_json(), "index dimension"),
+    ],
+)
+def test_get_document_index_disables_unusable_index(
+    tmp_path, monkeypatch, caplog, index_json, reason
+):
+    """Test that invalid, non-Bedrock or mis-sized indexes disable routing with a warning."""
+    index_path = tmp_path / "document_index.json"
+    index_path.write_text(index_json, encoding="utf-8")
+    monkeypatch.setenv("DOCUMENT_INDEX_PATH", str(index_path))
+
+    assert document_router.get_document_index() is None
+    assert reason in caplog.text
@@ -4,6 +4,7 @@ import json
 from unittest.mock import patch
 
 from handler import lambda_handler
+from schemas import Citation, QueryResponse
 
 
 def test_successful_query(api_gateway_event_base, mock_lambda_context, sample_query_request):
@@ -11,7 +12,7 @@ def test_successful_query(api_gateway_event_base, mock_lambda_context, sample_qu
     event = api_gateway_event_base.copy()
     event["body"] = json.dumps(sample_query_request)
 
-    with patch("handler.generate_text_from_kb", return_value="Test answer"):
+    with patch("handler.generate_answer_from_kb", return_value=QueryResponse(answer="Test answer")):
         response = lambda_handler(event, mock_lambda_context)
 
     assert response["statusCode"] == 200
@@ -53,9 +54,44 @@ def test_bedrock_error_returns_500(
     event = api_gateway_event_base.copy()
     event["body"] = json.dumps(sample_query_request)
 
-    with patch("handler.generate_text_from_kb", side_effect=RuntimeError("Bedrock error")):
+    with patch("handler.generate_answer_from_kb", side_effect=RuntimeError("Bedrock error")):
         response = lambda_handler(event, mock_lambda_context)
 
     assert response["statusCode"] == 500
     body = json.loads(response["body"])
     assert "error" in body
+
+
+def test_session_id_passed_through_and_echoed(
+    api_gateway_event_base, mock_lambda_context, sample_query_request
+):
+    """Test that session_id reaches the Bedrock client and is echoed in the response."""
+    event = api_gateway_event_base.copy()
+    event["body"] = json.dumps({**sample_query_request, "session_id": "session-1"})
+
+    with patch(
+        "handler.generate_answer_from_kb", return_value=QueryResponse(answer="Test answer")
+    ) as mock_generate:
+        response = lambda_handler(event, mock_lambda_context)
+
+    mock_generate.assert_called_once_with(sample_query_request["query"], session_id="session-1")
+    body = json.loads(response["body"])
+    assert body == {"answer": "Test answer", "citations": [], "session_id": "session-1"}
+
+
+def test_citations_included_in_response(
+    api_gateway_event_base, mock_lambda_context, sample_query_request
+):
+    """Test that citations from the Bedrock client are returned to the caller."""
+    event = api_gateway_event_base.copy()
+    event["body"] = json.dumps(sample_query_request)
+    answer = QueryResponse(
+        answer="Test answer",
+        citations=[Citation(source_uri="s3://docs/lens.pdf", excerpt="Serverless...")],
+    )
+
+    with patch("handler.generate_answer_from_kb", return_value=answer):
+        response = lambda_handler(event, mock_lambda_context)
+
+    body = json.loads(response["body"])
+    assert body["citations"] == [{"source_uri": "s3://docs/lens.pdf", "excerpt": "Serverless..."}]
@@ -33,3 +33,15 @@ def test_query_response_empty_raises_error():
     """Test that empty string raises ValidationError."""
     with pytest.raises(ValidationError):
         QueryResponse(answer="")
+
+
+def test_query_request_session_id_optional():
+    """Test that session_id defaults to None and accepts URL-safe IDs."""
+    assert QueryRequest(query="q").session_id is None
+    assert QueryRequest(query="q", session_id="abc-123_X").session_id == "abc-123_X"
+
+
+def test_query_request_invalid_session_id_raises_error():
+    """Test that session IDs with unsupported characters raise ValidationError."""
+    with pytest.raises(ValidationError):
+        QueryRequest(query="q", session_id="bad id!")
@@ -0,0 +1,80 @@
+"""Unit tests for conversation session storage."""
+
+from unittest.mock import patch
+
+import pytest
+import session_store
+from session_store import (
+    InMemorySessionStore,
+    KeyValueSessionStore,
+    LocalKeyValueClient,
+    SessionState,
+    Turn,
+)
+
+
+def test_session_state_render():
+    """Test that history renders summary first, then turns in order."""
+    state = SessionState(
+        summary="User asked about Lambda.",
+        turns=[Turn(question="What about cold starts?", answer="They add latency.")],
+    )
+
+    assert state.render() == (
+        "Summary of earlier conversation: User asked about Lambda.\n\n"
+        "User: What about cold starts?\nAssistant: They add latency."
+    )
+    assert SessionState().is_empty()
+
+
+def test_in_memory_store_round_trip():
+    """Test that the in-memory store returns stored state and None for unknown IDs."""
+    store = InMemorySessionStore()
+    state = SessionState(turns=[Turn(question="q", answer="a")])
+
+    store.put("s1", state)
+
+    assert store.get("s1") == state
+    assert store.get("unknown") is None
+
+
+def test_key_value_store_round_trip_with_ttl():
+    """Test that the key-value store serializes state and sets the TTL attribute."""
+    client = LocalKeyValueClient()
+    store = KeyValueSessionStore(client, "sessions", ttl_seconds=60)
+    state = SessionState(summary="s", turns=[Turn(question="q", answer="a")])
+
+    with patch("session_store.time.time", return_value=1000):
+        store.put("s1", state)
+
+    assert store.get("s1") == state
+    assert store.get("unknown") is None
+    item = client.get_item(TableName="sessions", Key={"session_id": {"S": "s1"}})["Item"]
+    assert item["expires_at"] == {"N": "1060"}
+
+
+@patch.dict("os.environ", {}, clear=True)
+def test_get_session_store_defaults_to_memory():
+    """Test that the in-memory store is used when SESSION_STORE is unset."""
+    store = session_store.get_session_store()
+
+    assert isinstance(store, InMemorySessionStore)
+    assert session_store.get_session_store() is store
+
+
+@patch.dict("os.environ", {"SESSION_STORE": "dynamodb", "SESSION_TABLE_NAME": "sessions"})
+def test_get_session_store_dynamodb():
+    """Test that the DynamoDB backend is created from environment configuration."""
+    with patch("session_store.boto3.client") as mock_client:
+        store = session_store.get_session_store()
+
+    mock_client.assert_called_once_with("dynamodb")
+    assert isinstance(store, KeyValueSessionStore)
+    assert store.table_name == "sessions"
+
+
+@patch.dict("os.environ", {"SESSION_STORE": "dynamodb"}, clear=True)
+def test_get_session_store_dynamodb_requires_table():
+    """Test that the DynamoDB backend requires SESSION_TABLE_NAME."""
+    with pytest.raises(ValueError, match="SESSION_TABLE_NAME is not configured"):
+        session_store.get_session_store()
@@ -0,0 +1,55 @@
+"""Pytest configuration and fixtures for replay-based performance tests."""
+
+import json
+from pathlib import Path
+from typing import Any
+
+import bedrock_client
+import bedrock_recorder
+import pytest
+import session_store
+
+PERF_DIR = Path(__file__).parent
+TRACE_PATH = PERF_DIR / "traces" / "production_shaped.jsonl"
+BUDGETS_PATH = PERF_DIR / "budgets.json"
+
+
+@pytest.fixture(scope="session")
+def trace_records() -> list[bedrock_recorder.TraceRecord]:
+    """Recorded Bedrock interactions replayed by the perf suite."""
+    return bedrock_recorder.load_trace(TRACE_PATH)
+
+
+@pytest.fixture(scope="session")
+def perf_budgets() -> dict[str, dict[str, float]]:
+    """Per-engine latency and allocation budgets for a single request."""
+    return json.loads(BUDGETS_PATH.read_text(encoding="utf-8"))
+
+
+@pytest.fixture
+def perf_environment(monkeypatch: pytest.MonkeyPatch):
+    """Configure the function as deployed with the default engine, without recording or routing."""
+    monkeypatch.setenv("BEDROCK_KB_ID", "KBTRACE001")
+    monkeypatch.setenv("BEDROCK_MODEL_ID", "amazon.nova-micro-v1:0")
+    monkeypatch.delenv("GENERATION_ENGINE", raising=False)
+    monkeypatch.delenv("BEDROCK_TRACE_DIR", raising=False)
+    monkeypatch.delenv("DOCUMENT_ROUTING_TOP_K", raising=False)
+    session_store._session_store = None
+    yield
+    bedrock_client._bedrock_agent_runtime_client = None
+    bedrock_client._bedrock_runtime_client = None
+    session_store._session_store = None
+
+
+@pytest.fixture
+def query_event() -> dict[str, Any]:
+    """API Gateway HTTP API v2 event for POST /query."""
+    return {
+        "version": "2.0",
+        "routeKey": "POST /query",
+        "rawPath": "/query",
+        "headers": {"content-type": "application/json"},
+        "requestContext": {"http": {"method": "POST", "path": "/query"}},
+        "body": json.dumps({"query": "How should I handle cold starts in Lambda?"}),
+        "isBase64Encoded": False,
+    }
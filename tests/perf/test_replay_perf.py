@@ -0,0 +1,108 @@
+"""Performance regression tests replaying recorded Bedrock traffic through the handler.
+
+Bedrock latency is excluded unless timings are replayed, so the budgets in
+budgets.json cover only the function's own overhead per request.
+"""
+
+import json
+import statistics
+import time
+import tracemalloc
+
+import bedrock_client
+import bedrock_recorder
+import pytest
+from bedrock_recorder import p95
+from handler import lambda_handler
+
+WARMUP_REQUESTS = 5
+MEASURED_REQUESTS = 50
+
+ENGINE_OPERATIONS = {
+    bedrock_client.ENGINE_RETRIEVE_INVOKE: {"retrieve", "invoke_model"},
+    bedrock_client.ENGINE_RETRIEVE_AND_GENERATE: {"retrieve_and_generate"},
+}
+
+
+def _install_replay_clients(monkeypatch, records, **options):
+    agent_client, runtime_client = bedrock_recorder.build_replay_clients(records, **options)
+    monkeypatch.setattr(bedrock_client, "_bedrock_agent_runtime_client", agent_client)
+    monkeypatch.setattr(bedrock_client, "_bedrock_runtime_client", runtime_client)
+
+
+def _require_engine_calls(engine, records):
+    """Skip budget checks for an engine whose calls the trace does not contain."""
+    missing = ENGINE_OPERATIONS[engine] - {record.operation for record in records}
+    if missing:
+        pytest.skip(f"trace has no {', '.join(sorted(missing))} calls for {engine}")
+
+
+@pytest.mark.parametrize("engine", bedrock_client.GENERATION_ENGINES)
+def test_handler_latency_within_budget(
+    engine, trace_records, perf_budgets, perf_environment, query_event, monkeypatch
+):
+    """Test that per-request handler overhead stays within the p95 latency budget."""
+    _require_engine_calls(engine, trace_records)
+    monkeypatch.setenv("GENERATION_ENGINE", engine)
+    _install_replay_clients(monkeypatch, trace_records)
+
+    for _ in range(WARMUP_REQUESTS):
+        assert lambda_handler(query_event, None)["statusCode"] == 200
+
+    latencies_ms = []
+    for _ in range(MEASURED_REQUESTS):
+        start = time.perf_counter()
+        lambda_handler(query_event, None)
+        latencies_ms.append((time.perf_counter() - start) * 1000)
+
+    p95_ms = p95(latencies_ms)
+    budget_ms = perf_budgets[engine]["p95_ms"]
+    assert p95_ms <= budget_ms, (
+        f"{engine}: p95 {p95_ms:.2f} ms exceeds budget {budget_ms} ms "
+        f"(median {statistics.median(latencies_ms):.2f} ms)"
+    )
+
+
+@pytest.mark.parametrize("engine", bedrock_client.GENERATION_ENGINES)
+def test_handler_allocations_within_budget(
+    engine, trace_records, perf_budgets, perf_environment, query_event, monkeypatch
+):
+    """Test that peak memory allocated per request stays within budget."""
+    _require_engine_calls(engine, trace_records)
+    monkeypatch.setenv("GENERATION_ENGINE", engine)
+    _install_replay_clients(monkeypatch, trace_records)
+
+    for _ in range(WARMUP_REQUESTS):
+        lambda_handler(query_event, None)
+
+    peaks_kib = []
+    tracemalloc.start()
+    try:
+        for _ in range(MEASURED_REQUESTS // 5):
+            baseline, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            lambda_handler(query_event, None)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks_kib.append((peak - baseline) / 1024)
+    finally:
+        tracemalloc.stop()
+
+    budget_kib = perf_budgets[engine]["peak_alloc_kib"]
+    assert max(peaks_kib) <= budget_kib, (
+        f"{engine}: peak allocation {max(peaks_kib):.1f} KiB exceeds budget {budget_kib} KiB"
+    )
+
+
+def test_replayed_timings_match_trace(trace_records, perf_environment, query_event, monkeypatch):
+    """Test that replaying with timings waits for each recorded Bedrock latency in order."""
+    sleeps = []
+    _install_replay_clients(
+        monkeypatch, trace_records, replay_timings=True, time_scale=0.5, sleep=sleeps.append
+    )
+
+    response = lambda_handler(query_event, None)
+
+    assert response["statusCode"] == 200
+    assert len(json.loads(response["body"])["citations"]) == 5
+    recorded = [r for r in trace_records if r.operation in ("retrieve", "invoke_model")]
+    assert sleeps == [recorded[0].latency_ms / 1000 * 0.5, recorded[1].latency_ms / 1000 * 0.5]
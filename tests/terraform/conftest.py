@@ -63,3 +63,9 @@ def bedrock_client(aws_region: str):
 def iam_client(aws_region: str):
     """Create boto3 IAM client."""
     return boto3.client("iam", region_name=aws_region)
+
+
+@pytest.fixture(scope="session")
+def dynamodb_client(aws_region: str):
+    """Create boto3 DynamoDB client."""
+    return boto3.client("dynamodb", region_name=aws_region)
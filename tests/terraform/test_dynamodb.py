@@ -0,0 +1,25 @@
+"""Tests for DynamoDB session table infrastructure."""
+
+from .utils import get_terraform_output
+
+
+def test_session_table_exists(terraform_outputs, dynamodb_client):
+    """Test that the session table exists and is keyed by session_id."""
+    table_name = get_terraform_output(terraform_outputs, "session_table_name")
+
+    response = dynamodb_client.describe_table(TableName=table_name)
+    table = response["Table"]
+
+    assert table["TableName"] == table_name
+    assert table["KeySchema"] == [{"AttributeName": "session_id", "KeyType": "HASH"}]
+
+
+def test_session_table_has_ttl(terraform_outputs, dynamodb_client):
+    """Test that expired sessions are removed via TTL."""
+    table_name = get_terraform_output(terraform_outputs, "session_table_name")
+
+    response = dynamodb_client.describe_time_to_live(TableName=table_name)
+    ttl = response["TimeToLiveDescription"]
+
+    assert ttl["TimeToLiveStatus"] in ("ENABLED", "ENABLING")
+    assert ttl["AttributeName"] == "expires_at"
@@ -25,7 +25,13 @@ def test_lambda_function_has_environment_variables(terraform_outputs, lambda_cli
     response = lambda_client.get_function_configuration(FunctionName=function_name)
     env_vars = response.get("Environment", {}).get("Variables", {})
 
-    required_vars = ["BEDROCK_KB_ID", "BEDROCK_MODEL_ID", "LOG_LEVEL"]
+    required_vars = [
+        "BEDROCK_KB_ID",
+        "BEDROCK_MODEL_ID",
+        "LOG_LEVEL",
+        "SESSION_STORE",
+        "SESSION_TABLE_NAME",
+    ]
     for var in required_vars:
         assert var in env_vars, f"Missing environment variable: {var}"
 
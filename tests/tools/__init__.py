@@ -0,0 +1 @@
+"""Tests for offline tooling."""
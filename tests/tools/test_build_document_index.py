@@ -0,0 +1,124 @@
+"""Unit tests for the document summary index builder."""
+
+import math
+from unittest.mock import MagicMock
+
+import build_document_index
+from botocore.exceptions import NoCredentialsError
+from chunking_evaluator import HashingEmbedder
+from document_router import DocumentIndex
+
+CORPUS = {
+    "lambda.txt": "Lambda functions scale automatically. Cold starts add latency. " * 80,
+    "dynamodb.txt": "DynamoDB on-demand capacity removes capacity planning. " * 80,
+    "empty.txt": "   ",
+}
+
+
+def test_summarize_document_returns_unit_vector():
+    """Test that window embeddings are averaged into a normalized summary vector."""
+    vector = build_document_index.summarize_document(
+        CORPUS["lambda.txt"], HashingEmbedder(dimension=32), window_tokens=50, max_windows=3
+    )
+
+    assert len(vector) == 32
+    assert math.isclose(math.sqrt(sum(v * v for v in vector)), 1.0)
+
+
+def test_sample_windows_spreads_across_document():
+    """Test that large documents are sampled evenly up to the window cap."""
+    windows = [str(i) for i in range(10)]
+
+    assert build_document_index._sample_windows(windows, 5) == ["0", "2", "4", "6", "8"]
+    assert build_document_index._sample_windows(windows[:3], 5) == ["0", "1", "2"]
+
+
+def test_build_document_index_routes_queries_to_matching_document():
+    """Test that the built index selects the document matching the query."""
+    embedder = HashingEmbedder(dimension=128)
+
+    index = build_document_index.build_document_index(
+        CORPUS, "docs-bucket", embedder, "bedrock", "amazon.titan-embed-text-v1"
+    )
+
+    assert index.embedder == "bedrock"
+    assert index.dimension == 128
+
+    assert [doc.source_uri for doc in index.documents] == [
+        "s3://docs-bucket/dynamodb.txt",
+        "s3://docs-bucket/lambda.txt",
+    ]
+    query_vector = embedder.embed(["What adds latency to Lambda cold starts?"])[0]
+    assert index.top_documents(query_vector, top_k=1) == ["s3://docs-bucket/lambda.txt"]
+
+
+def test_main_writes_index(tmp_path, capsys):
+    """Test that the CLI writes an index keyed by object keys relative to the corpus."""
+    corpus_dir = tmp_path / "corpus"
+    (corpus_dir / "guides").mkdir(parents=True)
+    (corpus_dir / "lambda.txt").write_text(CORPUS["lambda.txt"], encoding="utf-8")
+    (corpus_dir / "guides" / "lambda.txt").write_text(CORPUS["dynamodb.txt"], encoding="utf-8")
+    output_path = tmp_path / "document_index.json"
+
+    exit_code = build_document_index.main(
+        [
+            "--corpus",
+            str(corpus_dir),
+            "--bucket",
+            "docs-bucket",
+            "--output",
+            str(output_path),
+            "--embedder",
+            "hashing",
+        ]
+    )
+
+    assert exit_code == 0
+    assert "2 documents" in capsys.readouterr().out
+    index = DocumentIndex.model_validate_json(output_path.read_text(encoding="utf-8"))
+    assert [doc.source_uri for doc in index.documents] == [
+        "s3://docs-bucket/guides/lambda.txt",
+        "s3://docs-bucket/lambda.txt",
+    ]
+    assert (index.embedder, index.embedding_model_id, index.dimension) == (
+        "hashing",
+        "hashing-256",
+        256,
+    )
+
+
+def test_main_refuses_hashing_index_at_packaged_path(tmp_path, capsys):
+    """Test that a hashing index is never written where build_lambda.sh packages it."""
+    exit_code = build_document_index.main(
+        ["--corpus", str(tmp_path), "--bucket", "docs-bucket", "--embedder", "hashing"]
+    )
+
+    assert exit_code == 1
+    assert "cannot be used by the Lambda function" in capsys.readouterr().err
+    assert not build_document_index.DEFAULT_OUTPUT_PATH.exists()
+
+
+def test_main_reports_missing_corpus(tmp_path, capsys):
+    """Test that an empty corpus produces an error exit code."""
+    exit_code = build_document_index.main(
+        ["--corpus", str(tmp_path), "--bucket", "docs-bucket", "--output", str(tmp_path / "i")]
+    )
+
+    assert exit_code == 1
+    assert "No .pdf" in capsys.readouterr().err
+
+
+def test_main_reports_bedrock_errors(tmp_path, monkeypatch, capsys):
+    """Test that Bedrock embedding failures exit with an error message, not a traceback."""
+    (tmp_path / "lambda.txt").write_text(CORPUS["lambda.txt"], encoding="utf-8")
+    mock_client = MagicMock()
+    mock_client.invoke_model.side_effect = NoCredentialsError()
+    monkeypatch.setattr("boto3.client", lambda service: mock_client)
+
+    exit_code = build_document_index.main(
+        ["--corpus", str(tmp_path), "--bucket", "docs-bucket", "--output", str(tmp_path / "i")]
+    )
+
+    assert exit_code == 1
+    assert "Unable to locate credentials" in capsys.readouterr().err
+    assert not (tmp_path / "i").exists()
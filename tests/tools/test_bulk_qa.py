@@ -0,0 +1,376 @@
+"""Unit tests for the bulk question-answering job."""
+
+import json
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import bedrock_client
+import bulk_qa
+import pytest
+from botocore.exceptions import ClientError
+from schemas import QueryResponse
+
+
+class Crash(Exception):
+    """Simulates the process dying mid-run."""
+
+
+class LocalS3Client:
+    """Local stand-in for the S3 client's upload_file and download_file."""
+
+    def __init__(self):
+        self.objects: dict[tuple[str, str], bytes] = {}
+
+    def upload_file(self, filename: str, bucket: str, key: str) -> None:
+        self.objects[(bucket, key)] = Path(filename).read_bytes()
+
+    def download_file(self, bucket: str, key: str, filename: str) -> None:
+        Path(filename).write_bytes(self.objects[(bucket, key)])
+
+
+class LocalBedrockControlClient:
+    """Local stand-in for the Bedrock batch inference control plane."""
+
+    def __init__(self):
+        self.jobs: dict[str, dict] = {}
+
+    def create_model_invocation_job(self, **kwargs) -> dict:
+        job_arn = f"arn:aws:bedrock:us-east-1:123456789012:model-invocation-job/job{len(self.jobs)}"
+        self.jobs[job_arn] = {**kwargs, "status": "Completed"}
+        return {"jobArn": job_arn}
+
+    def get_model_invocation_job(self, jobIdentifier: str) -> dict:
+        return self.jobs[jobIdentifier]
+
+
+def _write_questions(path: Path, count: int) -> None:
+    path.write_text(
+        "\n".join(json.dumps({"id": f"q{i}", "query": f"Question {i}?"}) for i in range(count)),
+        encoding="utf-8",
+    )
+
+
+def _read_output(path: Path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def _echo_answer(query):
+    return QueryResponse(answer=f"Answer to {query}")
+
+
+def _throttling_error():
+    error = ClientError({"Error": {"Code": "ThrottlingException", "Message": "Slow down"}}, "x")
+    runtime_error = RuntimeError("Failed to generate answer: Slow down")
+    runtime_error.__cause__ = error
+    return runtime_error
+
+
+def test_run_online_writes_answers_in_input_order(tmp_path):
+    """Test that answers stream out in input order with throughput reported."""
+    input_path, output_path = tmp_path / "q.jsonl", tmp_path / "a.jsonl"
+    _write_questions(input_path, 7)
+
+    summary = bulk_qa.run_online(
+        input_path,
+        output_path,
+        tmp_path / "a.checkpoint",
+        concurrency=3,
+        answer_fn=_echo_answer,
+    )
+
+    results = _read_output(output_path)
+    assert [r["id"] for r in results] == [f"q{i}" for i in range(7)]
+    assert results[0] == {
+        "id": "q0",
+        "query": "Question 0?",
+        "answer": "Answer to Question 0?",
+        "citations": [],
+    }
+    assert summary["processed"] == 7
+    assert summary["answered"] == 7
+    assert summary["questions_per_minute"] > 0
+
+
+def test_run_online_resumes_after_crash(tmp_path):
+    """Test that a crashed run resumes from the checkpoint without duplicates."""
+    input_path, output_path = tmp_path / "q.jsonl", tmp_path / "a.jsonl"
+    checkpoint_path = tmp_path / "a.checkpoint"
+    _write_questions(input_path, 10)
+
+    def crash_on_q6(query):
+        if query == "Question 6?":
+            raise Crash()
+        return _echo_answer(query)
+
+    with pytest.raises(Crash):
+        bulk_qa.run_online(
+            input_path,
+            output_path,
+            checkpoint_path,
+            concurrency=1,
+            checkpoint_every=4,
+            answer_fn=crash_on_q6,
+        )
+    assert json.loads(checkpoint_path.read_text())["next_line"] == 4
+
+    calls = []
+
+    def record_calls(query):
+        calls.append(query)
+        return _echo_answer(query)
+
+    summary = bulk_qa.run_online(
+        input_path, output_path, checkpoint_path, concurrency=2, answer_fn=record_calls
+    )
+
+    assert [r["id"] for r in _read_output(output_path)] == [f"q{i}" for i in range(10)]
+    assert sorted(calls) == sorted(f"Question {i}?" for i in range(4, 10))
+    assert summary["processed"] == 6
+    assert summary["answered"] == 10
+
+
+def test_answer_question_backs_off_on_throttling():
+    """Test that throttled calls are retried and increase the shared delay."""
+    sleeps = []
+    backoff = bulk_qa.AdaptiveBackoff(initial_delay=1.0, sleep=sleeps.append)
+    answer_fn = MagicMock(side_effect=[_throttling_error(), _throttling_error(), _echo_answer("q")])
+
+    result = bulk_qa.answer_question(
+        {"id": "1", "query": "q", "session_id": "s1"}, backoff, answer_fn=answer_fn
+    )
+
+    assert result["answer"] == "Answer to q"
+    assert answer_fn.call_count == 3
+    # Questions are answered independently, without session history
+    answer_fn.assert_called_with("q")
+    assert len(sleeps) == 2
+    assert sleeps[1] > sleeps[0] / 2
+    assert backoff.delay == 1.0
+
+
+def test_answer_question_records_error_after_max_attempts():
+    """Test that persistent throttling and other failures are recorded, not raised."""
+    backoff = bulk_qa.AdaptiveBackoff(sleep=lambda seconds: None)
+    throttled = MagicMock(side_effect=_throttling_error())
+    failing = MagicMock(side_effect=RuntimeError("Unexpected response format"))
+
+    throttled_result = bulk_qa.answer_question(
+        {"id": "1", "query": "q"}, backoff, max_attempts=3, answer_fn=throttled
+    )
+    failing_result = bulk_qa.answer_question({"id": "2", "query": "q"}, backoff, answer_fn=failing)
+
+    assert throttled.call_count == 3
+    assert "Slow down" in throttled_result["error"]
+    assert failing.call_count == 1
+    assert failing_result["error"] == "Unexpected response format"
+
+
+def test_read_questions_defaults_id_and_flags_invalid_lines(tmp_path):
+    """Test that ids default to line numbers and invalid lines become error records."""
+    input_path = tmp_path / "q.jsonl"
+    input_path.write_text('{"query": "a"}\n\n{"id": "x", "query": "b"}\n{"id": "y"}\n{bad\n')
+
+    questions = list(bulk_qa.read_questions(input_path))
+
+    assert questions[:3] == [
+        (0, {"query": "a", "id": "1"}),
+        (2, {"id": "x", "query": "b"}),
+        (3, {"id": "y", "error": "'query' is required"}),
+    ]
+    assert questions[3][1]["id"] == "5"
+    assert questions[3][1]["error"].startswith("Invalid JSON")
+
+
+def test_batch_submit_and_collect(tmp_path, monkeypatch):
+    """Test the batch inference path end to end with local stand-in clients."""
+    monkeypatch.setenv("BEDROCK_KB_ID", "test-kb-id")
+    monkeypatch.setenv("BEDROCK_MODEL_ID", "amazon.nova-micro-v1:0")
+    mock_agent_client = MagicMock()
+    mock_agent_client.retrieve.side_effect = lambda **kwargs: {
+        "retrievalResults": []
+        if kwargs["retrievalQuery"]["text"] == "Question 2?"
+        else [{"content": {"text": "Context"}}]
+    }
+    monkeypatch.setattr(bedrock_client, "_bedrock_agent_runtime_client", mock_agent_client)
+
+    input_path, output_path = tmp_path / "q.jsonl", tmp_path / "a.jsonl"
+    _write_questions(input_path, 3)
+    s3_client, control_client = LocalS3Client(), LocalBedrockControlClient()
+
+    job_arn = bulk_qa.submit_batch(
+        input_path,
+        output_path,
+        "s3://bucket/bulk",
+        "arn:aws:iam::123456789012:role/batch",
+        s3_client,
+        control_client,
+        job_name="job-a",
+    )
+
+    job = control_client.jobs[job_arn]
+    assert job["modelId"] == "amazon.nova-micro-v1:0"
+    assert job["inputDataConfig"]["s3InputDataConfig"]["s3Uri"] == (
+        "s3://bucket/bulk/job-a/input/records.jsonl"
+    )
+    assert (
+        job["outputDataConfig"]["s3OutputDataConfig"]["s3Uri"] == "s3://bucket/bulk/job-a/output/"
+    )
+    records = [
+        json.loads(line)
+        for line in s3_client.objects[("bucket", "bulk/job-a/input/records.jsonl")].splitlines()
+    ]
+    assert [r["recordId"] for r in records] == ["q0", "q1"]
+    assert "Question: Question 0?" in records[0]["modelInput"]["messages"][0]["content"][0]["text"]
+    assert _read_output(output_path)[0]["answer"] == bedrock_client.NO_CONTEXT_ANSWER
+
+    # Simulate Bedrock writing the job output next to the input file name
+    batch_output = [
+        {
+            "recordId": "q0",
+            "modelOutput": {"output": {"message": {"content": [{"text": " Batch answer "}]}}},
+        },
+        {"recordId": "q1", "error": {"errorMessage": "Model error"}},
+    ]
+    s3_client.objects[("bucket", "bulk/job-a/output/job0/records.jsonl.out")] = "\n".join(
+        json.dumps(r) for r in batch_output
+    ).encode("utf-8")
+    control_client.jobs[job_arn]["status"] = "PartiallyCompleted"
+
+    summary = bulk_qa.collect_batch(job_arn, output_path, s3_client, control_client)
+
+    assert summary == {"answered": 1, "failed": 1}
+    assert _read_output(output_path)[1:] == [
+        {"id": "q0", "query": "Question 0?", "answer": "Batch answer"},
+        {"id": "q1", "query": "Question 1?", "error": "Model error"},
+    ]
+
+
+def test_batch_submit_retries_throttled_retrieval_and_defers_output(tmp_path, monkeypatch):
+    """Test that retrieval backs off on throttling and nothing is written until the job exists."""
+    monkeypatch.setenv("BEDROCK_MODEL_ID", "amazon.nova-micro-v1:0")
+    body = {"messages": []}
+    build_request = MagicMock(
+        side_effect=[_throttling_error(), body, None, _throttling_error(), body]
+    )
+    monkeypatch.setattr(bedrock_client, "build_model_request_from_kb", build_request)
+
+    input_path, output_path = tmp_path / "q.jsonl", tmp_path / "a.jsonl"
+    input_path.write_text(
+        '{"id": "q0", "query": "Question 0?"}\n{bad\n'
+        '{"id": "q2", "query": "Question 2?"}\n{"id": "q3", "query": "Question 3?"}\n'
+    )
+    control_client = LocalBedrockControlClient()
+    control_client.create_model_invocation_job = MagicMock(side_effect=_throttling_error())
+    backoff = bulk_qa.AdaptiveBackoff(sleep=lambda seconds: None)
+
+    with pytest.raises(RuntimeError):
+        bulk_qa.submit_batch(
+            input_path,
+            output_path,
+            "s3://bucket/bulk",
+            "arn:aws:iam::123456789012:role/batch",
+            LocalS3Client(),
+            control_client,
+            job_name="job-a",
+            backoff=backoff,
+        )
+    assert not output_path.exists()
+
+    build_request.side_effect = [body, None, RuntimeError("Unexpected response format")]
+    control_client = LocalBedrockControlClient()
+    bulk_qa.submit_batch(
+        input_path,
+        output_path,
+        "s3://bucket/bulk",
+        "arn:aws:iam::123456789012:role/batch",
+        LocalS3Client(),
+        control_client,
+        job_name="job-a",
+        backoff=backoff,
+    )
+
+    assert build_request.call_count == 8
+    output = _read_output(output_path)
+    assert [r["id"] for r in output] == ["2", "q2", "q3"]
+    assert output[1]["answer"] == bedrock_client.NO_CONTEXT_ANSWER
+    assert output[2]["error"] == "Unexpected response format"
+
+
+def test_collect_batch_requires_completed_job(tmp_path):
+    """Test that collecting an unfinished job fails clearly."""
+    control_client = LocalBedrockControlClient()
+    job_arn = control_client.create_model_invocation_job(jobName="j")["jobArn"]
+    control_client.jobs[job_arn]["status"] = "InProgress"
+
+    with pytest.raises(RuntimeError, match="is InProgress"):
+        bulk_qa.collect_batch(job_arn, tmp_path / "a.jsonl", LocalS3Client(), control_client)
+
+
+def test_main_run_with_stand_in_bedrock_clients(tmp_path, monkeypatch, capsys):
+    """Test the CLI run command through generate_answer_from_kb with stand-in clients."""
+    monkeypatch.setenv("BEDROCK_KB_ID", "test-kb-id")
+    monkeypatch.setenv("BEDROCK_MODEL_ID", "amazon.nova-micro-v1:0")
+    mock_agent_client = MagicMock()
+    mock_agent_client.retrieve.return_value = {"retrievalResults": [{"content": {"text": "C"}}]}
+    mock_runtime_client = MagicMock()
+    mock_runtime_client.invoke_model.side_effect = lambda **kwargs: {
+        "body": MagicMock(
+            read=lambda: json.dumps(
+                {"output": {"message": {"content": [{"text": "Answer"}]}}}
+            ).encode("utf-8")
+        )
+    }
+    monkeypatch.setattr(bedrock_client, "_bedrock_agent_runtime_client", mock_agent_client)
+    monkeypatch.setattr(bedrock_client, "_bedrock_runtime_client", mock_runtime_client)
+    input_path, output_path = tmp_path / "q.jsonl", tmp_path / "a.jsonl"
+    _write_questions(input_path, 3)
+
+    exit_code = bulk_qa.main(["run", "--input", str(input_path), "--output", str(output_path)])
+
+    assert exit_code == 0
+    assert "Processed 3 questions" in capsys.readouterr().out
+    assert [r["answer"] for r in _read_output(output_path)] == ["Answer"] * 3
+    assert (tmp_path / "a.jsonl.checkpoint").exists()
+
+
+def test_run_online_records_invalid_lines_and_continues(tmp_path):
+    """Test that invalid input lines are written as errors without aborting the run."""
+    input_path, output_path = tmp_path / "q.jsonl", tmp_path / "a.jsonl"
+    input_path.write_text(
+        '{"id": "q0", "query": "Question 0?"}\n{"id": "q1"}\nnot json\n'
+        '{"id": "q3", "query": "Question 3?"}\n',
+        encoding="utf-8",
+    )
+
+    summary = bulk_qa.run_online(
+        input_path, output_path, tmp_path / "a.checkpoint", answer_fn=_echo_answer
+    )
+
+    results = _read_output(output_path)
+    assert [r["id"] for r in results] == ["q0", "q1", "3", "q3"]
+    assert results[1] == {"id": "q1", "error": "'query' is required"}
+    assert "Invalid JSON" in results[2]["error"]
+    assert results[3]["answer"] == "Answer to Question 3?"
+    assert (summary["answered"], summary["failed"]) == (2, 2)
+
+
+def test_main_reports_missing_input(tmp_path, capsys):
+    """Test that a missing input file produces an error exit code."""
+    exit_code = bulk_qa.main(
+        ["run", "--input", str(tmp_path / "q.jsonl"), "--output", str(tmp_path / "a.jsonl")]
+    )
+
+    assert exit_code == 1
+    assert "q.jsonl" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("option", ["--concurrency", "--checkpoint-every"])
+def test_main_rejects_non_positive_run_options(tmp_path, option, capsys):
+    """Test that zero concurrency or checkpoint interval is rejected by the CLI."""
+    with pytest.raises(SystemExit) as exc_info:
+        bulk_qa.main(
+            ["run", "--input", str(tmp_path / "q.jsonl"), "--output", "a.jsonl", option, "0"]
+        )
+
+    assert exc_info.value.code == 2
+    assert "must be a positive integer" in capsys.readouterr().err
@@ -0,0 +1,194 @@
+"""Unit tests for the chunking-strategy evaluator."""
+
+import json
+from unittest.mock import MagicMock
+
+import chunking_evaluator
+import pytest
+from botocore.exceptions import NoCredentialsError
+from chunking_evaluator import (
+    BedrockEmbedder,
+    FixedSizeStrategy,
+    HashingEmbedder,
+    HierarchicalStrategy,
+    SemanticStrategy,
+    StrategyReport,
+    evaluate_strategy,
+    recommend,
+    render_terraform,
+)
+
+CORPUS = {
+    "lens.txt": (
+        "Lambda functions scale automatically with the number of requests. "
+        "Cold starts add latency to the first invocation of a new execution environment. "
+        "API Gateway throttles requests above the configured rate limit. "
+        "DynamoDB on-demand capacity removes the need for capacity planning. "
+        "Step Functions coordinate multiple services into serverless workflows."
+    )
+}
+
+GOLDEN = [
+    {"question": "What adds latency to the first invocation?", "expected_text": "Cold starts"},
+    {"question": "What does API Gateway do above the rate limit?", "expected_text": "throttles"},
+]
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    """Test that the local embedder returns identical unit vectors for identical text."""
+    embedder = HashingEmbedder(dimension=64)
+    first, second = embedder.embed(["cold start latency", "cold start latency"])
+
+    assert first == second
+    assert len(first) == 64
+    assert sum(value * value for value in first) == pytest.approx(1.0)
+
+
+def test_bedrock_embedder_invokes_titan():
+    """Test that the Bedrock embedder sends Titan request bodies and normalizes vectors."""
+    mock_client = MagicMock()
+    mock_body = MagicMock()
+    mock_body.read.return_value = json.dumps({"embedding": [3.0, 4.0]}).encode("utf-8")
+    mock_client.invoke_model.return_value = {"body": mock_body}
+
+    embedder = BedrockEmbedder(client=mock_client)
+    vectors = embedder.embed(["hello"])
+
+    assert vectors == [pytest.approx([0.6, 0.8])]
+    assert embedder.dimension == 2
+    call_args = mock_client.invoke_model.call_args
+    assert call_args.kwargs["modelId"] == "amazon.titan-embed-text-v1"
+    assert json.loads(call_args.kwargs["body"]) == {"inputText": "hello"}
+
+
+def test_bedrock_embedder_dimension_follows_model():
+    """Test that the dimension comes from the model's embeddings, not a fixed Titan v1 size."""
+    mock_client = MagicMock()
+    mock_body = MagicMock()
+    mock_body.read.return_value = json.dumps({"embedding": [0.5] * 1024}).encode("utf-8")
+    mock_client.invoke_model.return_value = {"body": mock_body}
+
+    embedder = BedrockEmbedder("amazon.titan-embed-text-v2:0", client=mock_client)
+
+    assert embedder.dimension == 1024
+    assert mock_client.invoke_model.call_count == 1
+
+
+def test_fixed_size_strategy_overlaps_windows():
+    """Test that fixed-size chunks respect max tokens and overlap."""
+    text = " ".join(f"w{i}" for i in range(25))
+    chunks = FixedSizeStrategy(max_tokens=10, overlap_percentage=20).chunk(
+        "doc", text, HashingEmbedder()
+    )
+
+    assert [len(chunk.text.split()) for chunk in chunks] == [10, 10, 9]
+    assert chunks[0].text.split()[-2:] == chunks[1].text.split()[:2]
+
+
+def test_semantic_strategy_keeps_sentences_whole():
+    """Test that semantic chunks never split a sentence and respect max tokens."""
+    chunks = SemanticStrategy(max_tokens=20).chunk("doc", CORPUS["lens.txt"], HashingEmbedder())
+
+    assert len(chunks) > 1
+    assert all(chunk.text.endswith(".") for chunk in chunks)
+    assert all(len(chunk.text.split()) <= 20 for chunk in chunks)
+
+
+def test_hierarchical_strategy_returns_parent_context():
+    """Test that hierarchical child chunks carry their parent text as context."""
+    text = " ".join(f"w{i}" for i in range(30))
+    chunks = HierarchicalStrategy(
+        parent_max_tokens=20, child_max_tokens=10, overlap_tokens=2
+    ).chunk("doc", text, HashingEmbedder())
+
+    assert all(len(chunk.text.split()) <= 10 for chunk in chunks)
+    assert chunks[0].context == " ".join(f"w{i}" for i in range(20))
+    assert chunks[-1].context == " ".join(f"w{i}" for i in range(20, 30))
+
+
+def test_evaluate_strategy_measures_recall_and_index_size():
+    """Test that evaluation reports recall, context tokens and index size."""
+    embedder = HashingEmbedder(dimension=128)
+    report = evaluate_strategy(
+        FixedSizeStrategy(max_tokens=500, overlap_percentage=0), CORPUS, GOLDEN, embedder, top_k=1
+    )
+
+    assert report.recall == 1.0
+    assert report.chunk_count == 1
+    assert report.avg_context_tokens == len(CORPUS["lens.txt"].split())
+    assert report.index_bytes == 128 * 4
+
+
+def test_recommend_prefers_smaller_context_within_tolerance():
+    """Test that the recommendation trades a small recall drop for smaller prompts."""
+    large = StrategyReport(FixedSizeStrategy(500, 10), 0.90, 900.0, 10, 1000)
+    small = StrategyReport(FixedSizeStrategy(200, 20), 0.88, 400.0, 30, 3000)
+    poor = StrategyReport(FixedSizeStrategy(100, 0), 0.50, 100.0, 60, 6000)
+
+    assert recommend([large, small, poor], recall_tolerance=0.05) is small
+    assert recommend([large, small, poor], recall_tolerance=0.0) is large
+
+
+def test_render_terraform_for_hierarchical_strategy():
+    """Test that the recommendation maps onto the data source chunking configuration."""
+    report = StrategyReport(HierarchicalStrategy(1500, 300, 60), 1.0, 10.0, 1, 1)
+    hcl = render_terraform(report)
+
+    assert hcl.startswith("vector_ingestion_configuration {")
+    assert 'chunking_strategy = "HIERARCHICAL"' in hcl
+    assert hcl.count("level_configuration {") == 2
+    assert "overlap_tokens = 60" in hcl
+
+
+def test_main_prints_recommendation(tmp_path, capsys):
+    """Test the CLI end to end with a text corpus and the hashing embedder."""
+    corpus_dir = tmp_path / "kb"
+    corpus_dir.mkdir()
+    (corpus_dir / "lens.txt").write_text(CORPUS["lens.txt"], encoding="utf-8")
+    golden_path = tmp_path / "golden.jsonl"
+    golden_path.write_text("\n".join(json.dumps(r) for r in GOLDEN), encoding="utf-8")
+
+    exit_code = chunking_evaluator.main(["--corpus", str(corpus_dir), "--golden", str(golden_path)])
+
+    output = capsys.readouterr().out
+    assert exit_code == 0
+    assert "Recommended strategy:" in output
+    assert "chunking_configuration {" in output
+
+
+def test_main_rejects_invalid_golden_set(tmp_path, capsys):
+    """Test that golden records without expected text are reported as errors."""
+    (tmp_path / "lens.txt").write_text(CORPUS["lens.txt"], encoding="utf-8")
+    golden_path = tmp_path / "golden.jsonl"
+    golden_path.write_text(json.dumps({"question": "Why?"}), encoding="utf-8")
+
+    exit_code = chunking_evaluator.main(
+        ["--corpus", str(tmp_path / "lens.txt"), "--golden", str(golden_path)]
+    )
+
+    assert exit_code == 1
+    assert "expected_text" in capsys.readouterr().err
+
+
+def test_main_reports_bedrock_errors(tmp_path, monkeypatch, capsys):
+    """Test that Bedrock failures with --embedder bedrock exit with an error message."""
+    (tmp_path / "lens.txt").write_text(CORPUS["lens.txt"], encoding="utf-8")
+    golden_path = tmp_path / "golden.jsonl"
+    golden_path.write_text("\n".join(json.dumps(r) for r in GOLDEN), encoding="utf-8")
+    mock_client = MagicMock()
+    mock_client.invoke_model.side_effect = NoCredentialsError()
+    monkeypatch.setattr("boto3.client", lambda service: mock_client)
+
+    exit_code = chunking_evaluator.main(
+        [
+            "--corpus",
+            str(tmp_path / "lens.txt"),
+            "--golden",
+            str(golden_path),
+            "--embedder",
+            "bedrock",
+        ]
+    )
+
+    assert exit_code == 1
+    assert "Unable to locate credentials" in capsys.readouterr().err
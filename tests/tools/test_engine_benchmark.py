@@ -0,0 +1,135 @@
+"""Unit tests for the generation engine benchmark."""
+
+import os
+
+import bedrock_client
+import engine_benchmark
+import pytest
+from bedrock_recorder import TraceRecord
+
+NOVA_MODEL_ID = "amazon.nova-micro-v1:0"
+
+
+def _record(service: str, operation: str, latency_ms: float, params=None, response=None):
+    return TraceRecord(
+        service=service,
+        operation=operation,
+        params=params or {},
+        response=response,
+        latency_ms=latency_ms,
+    )
+
+
+TRACE = [
+    _record(
+        "bedrock-agent-runtime",
+        "retrieve",
+        200.0,
+        response={"retrievalResults": [{"content": {"text": "Lambda scales automatically."}}]},
+    ),
+    *[
+        _record(
+            "bedrock-runtime",
+            "invoke_model",
+            latency_ms,
+            params={"modelId": NOVA_MODEL_ID, "body": {"messages": []}},
+            response={"body": {"output": {"message": {"content": [{"text": "Answer"}]}}}},
+        )
+        for latency_ms in (800.0, 1200.0)
+    ],
+    _record(
+        "bedrock-agent-runtime",
+        "retrieve_and_generate",
+        900.0,
+        response={"output": {"text": "Answer"}, "citations": []},
+    ),
+]
+
+
+class FakeClock:
+    """Deterministic clock advanced by the replay clients' sleeps."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _write_trace(path, records):
+    path.write_text("".join(r.model_dump_json() + "\n" for r in records), encoding="utf-8")
+
+
+def test_retrieve_invoke_replays_both_calls():
+    """Test that the two-call engine pays for retrieve plus invoke_model."""
+    clock = FakeClock()
+
+    latencies = engine_benchmark.run_engine(
+        bedrock_client.ENGINE_RETRIEVE_INVOKE, TRACE, 2, sleep=clock.sleep, clock=clock
+    )
+
+    assert latencies == pytest.approx([1.0, 1.4])
+
+
+def test_retrieve_and_generate_replays_single_call():
+    """Test that the single-call engine pays only for retrieve_and_generate."""
+    clock = FakeClock()
+
+    latencies = engine_benchmark.run_engine(
+        bedrock_client.ENGINE_RETRIEVE_AND_GENERATE, TRACE, 3, sleep=clock.sleep, clock=clock
+    )
+
+    assert latencies == pytest.approx([0.9, 0.9, 0.9])
+
+
+def test_run_engine_restores_clients_and_environment(monkeypatch):
+    """Test that the benchmark leaves module clients and environment untouched."""
+    monkeypatch.delenv("GENERATION_ENGINE", raising=False)
+    clock = FakeClock()
+
+    engine_benchmark.run_engine(
+        bedrock_client.ENGINE_RETRIEVE_AND_GENERATE, TRACE, 1, sleep=clock.sleep, clock=clock
+    )
+
+    assert "GENERATION_ENGINE" not in os.environ
+    assert bedrock_client._bedrock_agent_runtime_client is None
+    assert bedrock_client._bedrock_runtime_client is None
+
+
+def test_summarize_and_format():
+    """Test that summaries are reported in milliseconds with speedup."""
+    results = {
+        bedrock_client.ENGINE_RETRIEVE_INVOKE: engine_benchmark.summarize([1.0, 1.0, 2.0]),
+        bedrock_client.ENGINE_RETRIEVE_AND_GENERATE: engine_benchmark.summarize([0.5, 1.0, 1.5]),
+    }
+
+    assert results[bedrock_client.ENGINE_RETRIEVE_INVOKE]["p50_ms"] == pytest.approx(1000.0)
+    assert results[bedrock_client.ENGINE_RETRIEVE_INVOKE]["p95_ms"] == pytest.approx(2000.0)
+    assert "1.33x" in engine_benchmark.format_summary(results)
+
+
+def test_main_reports_both_engines(tmp_path, capsys):
+    """Test the CLI end to end with latencies scaled down to zero."""
+    trace_path = tmp_path / "trace.jsonl"
+    _write_trace(trace_path, TRACE)
+
+    exit_code = engine_benchmark.main(
+        ["--trace", str(trace_path), "--queries", "2", "--time-scale", "0"]
+    )
+
+    output = capsys.readouterr().out
+    assert exit_code == 0
+    assert "retrieve_invoke" in output
+    assert "retrieve_and_generate" in output
+
+
+def test_main_rejects_incomplete_trace(tmp_path, capsys):
+    """Test that traces without every call type are rejected."""
+    trace_path = tmp_path / "trace.jsonl"
+    _write_trace(trace_path, TRACE[:1])
+
+    assert engine_benchmark.main(["--trace", str(trace_path)]) == 1
+    assert "invoke_model" in capsys.readouterr().err
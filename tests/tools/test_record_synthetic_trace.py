@@ -0,0 +1,64 @@
+"""Unit tests for the synthetic trace recorder."""
+
+import bedrock_client
+import bedrock_recorder
+import engine_benchmark
+import record_synthetic_trace
+
+
+def test_record_trace_covers_both_engines_with_redaction(tmp_path):
+    """Test that the trace is recorded through RecordingClient for both engines."""
+    trace_path = tmp_path / "trace.jsonl"
+
+    count = record_synthetic_trace.record_trace(trace_path, questions=2)
+
+    records = bedrock_recorder.load_trace(trace_path)
+    assert count == len(records) == 6
+    assert [record.operation for record in records] == [
+        "retrieve",
+        "invoke_model",
+        "retrieve",
+        "invoke_model",
+        "retrieve_and_generate",
+        "retrieve_and_generate",
+    ]
+    retrieve, invoke, generate = records[0], records[1], records[4]
+    low, high = record_synthetic_trace.LATENCY_MS["retrieve_and_generate"]
+    assert low <= generate.latency_ms <= high
+    # Query, prompt and generated text are redacted; retrieved chunks are kept
+    assert retrieve.params["retrievalQuery"]["text"] == "<redacted:42 chars>"
+    chunk = retrieve.response["retrievalResults"][0]["content"]["text"]
+    assert len(chunk) >= record_synthetic_trace.CHUNK_CHARS[0]
+    assert not chunk.startswith("<redacted:")
+    answer = invoke.response["body"]["output"]["message"]["content"][0]["text"]
+    assert answer.startswith("<redacted:")
+    generation = generate.params["retrieveAndGenerateConfiguration"]["knowledgeBaseConfiguration"][
+        "generationConfiguration"
+    ]
+    assert generation["promptTemplate"]["textPromptTemplate"].startswith("<redacted:")
+    assert generate.response["output"]["text"].startswith("<redacted:")
+    # The benchmark accepts the trace, and recording leaves the real clients in place
+    assert engine_benchmark.load_trace(trace_path) == records
+    assert bedrock_client._bedrock_agent_runtime_client is None
+
+
+def test_record_trace_is_deterministic_per_seed(tmp_path):
+    """Test that the same seed reproduces the same trace."""
+    first, second, other = tmp_path / "a.jsonl", tmp_path / "b.jsonl", tmp_path / "c.jsonl"
+
+    record_synthetic_trace.record_trace(first, questions=1)
+    record_synthetic_trace.record_trace(second, questions=1)
+    record_synthetic_trace.record_trace(other, questions=1, seed=1)
+
+    assert first.read_text() == second.read_text()
+    assert first.read_text() != other.read_text()
+
+
+def test_main_writes_trace(tmp_path, capsys):
+    """Test the CLI end to end."""
+    trace_path = tmp_path / "trace.jsonl"
+
+    exit_code = record_synthetic_trace.main(["--output", str(trace_path), "--questions", "1"])
+
+    assert exit_code == 0
+    assert "Wrote 3 trace records" in capsys.readouterr().out
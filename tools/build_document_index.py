@@ -0,0 +1,154 @@
+"""Build the document summary index used for two-stage retrieval.
+
+Each document in the Knowledge Base corpus is split into fixed-size windows,
+the windows are embedded with the Knowledge Base's Titan model and averaged
+into one normalized summary vector per document. The resulting index is
+written to lambda/document_index.json and packaged with the Lambda function,
+where ``document_router`` uses it to pick the top-K documents before chunk
+retrieval. Rebuild it whenever documents are added to the S3 bucket.
+
+Usage:
+    python tools/build_document_index.py --corpus knowledge-base --bucket <documents-bucket>
+"""
+
+import argparse
+import math
+import sys
+from pathlib import Path
+
+from botocore.exceptions import BotoCoreError, ClientError
+from chunking_evaluator import (
+    TITAN_EMBEDDING_MODEL_ID,
+    BedrockEmbedder,
+    Embedder,
+    FixedSizeStrategy,
+    HashingEmbedder,
+    load_corpus,
+)
+from document_router import BEDROCK_EMBEDDER, DocumentIndex, DocumentVector
+
+DEFAULT_OUTPUT_PATH = Path(__file__).resolve().parent.parent / "lambda" / "document_index.json"
+WINDOW_TOKENS = 300
+MAX_WINDOWS_PER_DOCUMENT = 64
+
+
+def _sample_windows(windows: list[str], max_windows: int) -> list[str]:
+    """Pick at most max_windows windows spread evenly across the document."""
+    if len(windows) <= max_windows:
+        return windows
+    step = len(windows) / max_windows
+    return [windows[int(i * step)] for i in range(max_windows)]
+
+
+def summarize_document(
+    text: str,
+    embedder: Embedder,
+    window_tokens: int = WINDOW_TOKENS,
+    max_windows: int = MAX_WINDOWS_PER_DOCUMENT,
+) -> list[float]:
+    """Embed a document as the normalized mean of its window embeddings."""
+    strategy = FixedSizeStrategy(max_tokens=window_tokens, overlap_percentage=0)
+    windows = [chunk.text for chunk in strategy.chunk("", text, embedder)]
+    vectors = embedder.embed(_sample_windows(windows, max_windows))
+    if not vectors:
+        return [0.0] * embedder.dimension
+
+    mean = [sum(values) / len(vectors) for values in zip(*vectors, strict=True)]
+    norm = math.sqrt(sum(value * value for value in mean))
+    if norm == 0:
+        return mean
+    return [value / norm for value in mean]
+
+
+def build_document_index(
+    corpus: dict[str, str],
+    bucket: str,
+    embedder: Embedder,
+    embedder_name: str,
+    embedding_model_id: str,
+    max_windows: int = MAX_WINDOWS_PER_DOCUMENT,
+) -> DocumentIndex:
+    """
+    Build summary vectors keyed by the S3 URI the Knowledge Base stores for each document.
+
+    Corpus names are object keys relative to the bucket root.
+    """
+    documents = [
+        DocumentVector(
+            source_uri=f"s3://{bucket}/{name}",
+            vector=summarize_document(text, embedder, max_windows=max_windows),
+        )
+        for name, text in sorted(corpus.items())
+        if text.strip()
+    ]
+    dimension = len(documents[0].vector) if documents else embedder.dimension
+    return DocumentIndex(
+        embedder=embedder_name,
+        embedding_model_id=embedding_model_id,
+        dimension=dimension,
+        documents=documents,
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--corpus",
+        type=Path,
+        required=True,
+        help="Directory mirroring the S3 bucket (paths below it are the object keys)",
+    )
+    parser.add_argument("--bucket", required=True, help="Knowledge Base documents bucket name")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT_PATH, help="Index path")
+    parser.add_argument(
+        "--model-id",
+        default=TITAN_EMBEDDING_MODEL_ID,
+        help="Embedding model (must match the Knowledge Base embedding model)",
+    )
+    parser.add_argument(
+        "--max-windows",
+        type=int,
+        default=MAX_WINDOWS_PER_DOCUMENT,
+        help="Windows embedded per document",
+    )
+    parser.add_argument(
+        "--embedder",
+        choices=["hashing", "bedrock"],
+        default="bedrock",
+        help="Embedding backend (hashing is a deterministic local stand-in for dry runs)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.embedder != BEDROCK_EMBEDDER and args.output.resolve() == DEFAULT_OUTPUT_PATH:
+        print(
+            f"Error: a {args.embedder} index cannot be used by the Lambda function; "
+            "pass --output to write it somewhere other than the packaged index",
+            file=sys.stderr,
+        )
+        return 1
+
+    try:
+        corpus = load_corpus(args.corpus)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    try:
+        if args.embedder == BEDROCK_EMBEDDER:
+            embedder, model_id = BedrockEmbedder(args.model_id), args.model_id
+        else:
+            embedder = HashingEmbedder()
+            model_id = f"hashing-{embedder.dimension}"
+        index = build_document_index(
+            corpus, args.bucket, embedder, args.embedder, model_id, max_windows=args.max_windows
+        )
+    except (ClientError, BotoCoreError) as e:
+        print(f"Error: embedding with Bedrock failed: {e}", file=sys.stderr)
+        return 1
+    args.output.write_text(index.model_dump_json(), encoding="utf-8")
+    print(f"Wrote summary vectors for {len(index.documents)} documents to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
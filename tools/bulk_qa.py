@@ -0,0 +1,496 @@
+"""Bulk offline question answering over the Knowledge Base.
+
+Streams questions from a JSONL file through the same pipeline as ``POST /query``
+and streams answers to a JSONL file, so memory stays constant regardless of
+input size. Work runs with bounded concurrency and backs off adaptively on
+throttling; periodic checkpoints let a crashed run resume where it stopped.
+
+Input lines:  {"id": "q1", "query": "What is a cold start?"}  (id defaults to line number)
+              Questions are answered independently; no session history is kept.
+Output lines: {"id": "q1", "query": "...", "answer": "...", "citations": [...]}
+              {"id": "q2", "query": "...", "error": "..."}
+              {"id": "3", "error": "..."}  (input line that is not valid JSON or has no query)
+
+Usage:
+    python tools/bulk_qa.py run --input questions.jsonl --output answers.jsonl
+    python tools/bulk_qa.py batch-submit --input questions.jsonl --output answers.jsonl \\
+        --s3-uri s3://bucket/bulk-qa --role-arn arn:aws:iam::123456789012:role/batch
+    python tools/bulk_qa.py batch-collect --job-arn <job-arn> --output answers.jsonl
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, TextIO, TypeVar
+
+import bedrock_client
+import boto3
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+T = TypeVar("T")
+
+MAX_ATTEMPTS = 5
+BATCH_COMPLETED_STATUSES = {"Completed", "PartiallyCompleted"}
+
+THROTTLING_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceQuotaExceededException",
+    "ModelNotReadyException",
+}
+
+
+def read_questions(input_path: Path, start_line: int = 0) -> Iterator[tuple[int, dict[str, Any]]]:
+    """
+    Stream (line number, record) pairs from JSONL, skipping lines before start_line.
+
+    Invalid lines are yielded as {"id": ..., "error": ...} records so one bad line
+    does not abort a long run.
+    """
+    with input_path.open(encoding="utf-8") as f:
+        for line_number, line in enumerate(f):
+            if line_number < start_line or not line.strip():
+                continue
+            default_id = str(line_number + 1)
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, {"id": default_id, "error": f"Invalid JSON: {e}"}
+                continue
+            if not isinstance(record, dict) or not record.get("query"):
+                record_id = record.get("id", default_id) if isinstance(record, dict) else default_id
+                yield line_number, {"id": record_id, "error": "'query' is required"}
+                continue
+            record.setdefault("id", default_id)
+            yield line_number, record
+
+
+def is_throttling_error(error: Exception) -> bool:
+    """Check whether an error (or the ClientError it wraps) is a throttling error."""
+    cause = error if isinstance(error, ClientError) else error.__cause__
+    if not isinstance(cause, ClientError):
+        return False
+    return cause.response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES
+
+
+class AdaptiveBackoff:
+    """
+    Shared delay between calls that grows on throttling and shrinks on success.
+
+    All workers wait the current delay before each call, so one throttled call
+    slows the whole pool down instead of every worker discovering the limit alone.
+    """
+
+    def __init__(
+        self,
+        initial_delay: float = 0.5,
+        max_delay: float = 30.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.delay = 0.0
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            delay = self.delay
+        if delay:
+            self._sleep(delay * random.uniform(0.5, 1.0))
+
+    def on_throttle(self) -> None:
+        with self._lock:
+            self.delay = min(max(self.delay * 2, self.initial_delay), self.max_delay)
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.delay = self.delay / 2 if self.delay > self.initial_delay / 4 else 0.0
+
+
+def call_with_backoff(
+    call: Callable[[], T],
+    record_id: str,
+    backoff: AdaptiveBackoff,
+    max_attempts: int = MAX_ATTEMPTS,
+) -> T:
+    """Make one Bedrock call for a question, retrying throttled attempts with shared backoff."""
+    attempt = 0
+    while True:
+        attempt += 1
+        backoff.wait()
+        try:
+            result = call()
+        except (RuntimeError, ValueError) as e:
+            if is_throttling_error(e) and attempt < max_attempts:
+                logger.warning(f"Throttled on question {record_id} (attempt {attempt})")
+                backoff.on_throttle()
+                continue
+            raise
+        backoff.on_success()
+        return result
+
+
+def answer_question(
+    record: dict[str, Any],
+    backoff: AdaptiveBackoff,
+    max_attempts: int = MAX_ATTEMPTS,
+    answer_fn: Callable[[str], Any] = bedrock_client.generate_answer_from_kb,
+) -> dict[str, Any]:
+    """Answer one question, retrying throttled calls. Errors are recorded, not raised."""
+    result = {"id": record["id"], "query": record["query"]}
+    try:
+        response = call_with_backoff(
+            partial(answer_fn, record["query"]), record["id"], backoff, max_attempts
+        )
+    except (RuntimeError, ValueError) as e:
+        result["error"] = str(e)
+        return result
+
+    result.update(response.model_dump(include={"answer", "citations"}))
+    return result
+
+
+def load_checkpoint(checkpoint_path: Path) -> dict[str, int]:
+    """Load checkpoint state, or a fresh state if no checkpoint exists."""
+    if not checkpoint_path.exists():
+        return {"next_line": 0, "output_bytes": 0, "answered": 0, "failed": 0}
+    return json.loads(checkpoint_path.read_text(encoding="utf-8"))
+
+
+def save_checkpoint(checkpoint_path: Path, state: dict[str, int]) -> None:
+    """Atomically replace the checkpoint file."""
+    tmp_path = checkpoint_path.with_suffix(checkpoint_path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(state), encoding="utf-8")
+    os.replace(tmp_path, checkpoint_path)
+
+
+def run_online(
+    input_path: Path,
+    output_path: Path,
+    checkpoint_path: Path,
+    concurrency: int = 4,
+    checkpoint_every: int = 50,
+    backoff: AdaptiveBackoff | None = None,
+    answer_fn: Callable[[str], Any] = bedrock_client.generate_answer_from_kb,
+    clock: Callable[[], float] = time.monotonic,
+) -> dict[str, Any]:
+    """
+    Answer all questions with bounded concurrency, resuming from the checkpoint.
+
+    Answers are written in input order. The checkpoint records the next input
+    line and the output size at that point; on resume the output is truncated
+    back to that size so answers written after the last checkpoint are not
+    duplicated. Without a checkpoint the output file is overwritten.
+    """
+    backoff = backoff or AdaptiveBackoff()
+    state = load_checkpoint(checkpoint_path)
+    if state["next_line"]:
+        logger.info(f"Resuming from input line {state['next_line'] + 1}")
+
+    started = clock()
+    processed = 0
+    window: deque[tuple[int, Future]] = deque()
+
+    # Append mode with truncation drops answers written after the last checkpoint
+    with output_path.open("a", encoding="utf-8") as out:
+        out.truncate(state["output_bytes"])
+
+        def write_head() -> None:
+            nonlocal processed
+            line_number, future = window.popleft()
+            result = future.result()
+            out.write(json.dumps(result) + "\n")
+            state["next_line"] = line_number + 1
+            state["failed" if "error" in result else "answered"] += 1
+            processed += 1
+            if processed % checkpoint_every == 0:
+                _checkpoint(out, checkpoint_path, state)
+                logger.info(
+                    f"Checkpoint: {processed} questions, "
+                    f"{_per_minute(processed, clock() - started):.1f} questions/min"
+                )
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for line_number, record in read_questions(input_path, state["next_line"]):
+                if "error" in record:
+                    logger.warning(f"Skipping input line {line_number + 1}: {record['error']}")
+                    future = Future()
+                    future.set_result(record)
+                else:
+                    future = executor.submit(
+                        answer_question, record, backoff, MAX_ATTEMPTS, answer_fn
+                    )
+                window.append((line_number, future))
+                # Bound in-flight work (and memory) to twice the worker count
+                if len(window) >= concurrency * 2:
+                    write_head()
+            while window:
+                write_head()
+
+        _checkpoint(out, checkpoint_path, state)
+
+    elapsed = clock() - started
+    return {
+        "processed": processed,
+        "answered": state["answered"],
+        "failed": state["failed"],
+        "elapsed_seconds": elapsed,
+        "questions_per_minute": _per_minute(processed, elapsed),
+    }
+
+
+def _checkpoint(out: TextIO, checkpoint_path: Path, state: dict[str, int]) -> None:
+    out.flush()
+    os.fsync(out.fileno())
+    state["output_bytes"] = out.tell()
+    save_checkpoint(checkpoint_path, state)
+
+
+def _per_minute(count: int, elapsed_seconds: float) -> float:
+    return count * 60 / elapsed_seconds if elapsed_seconds > 0 else 0.0
+
+
+def _split_s3_uri(s3_uri: str) -> tuple[str, str]:
+    if not s3_uri.startswith("s3://"):
+        raise ValueError(f"Expected an s3:// URI, got {s3_uri}")
+    bucket, _, prefix = s3_uri[len("s3://") :].partition("/")
+    return bucket, prefix.strip("/")
+
+
+def submit_batch(
+    input_path: Path,
+    output_path: Path,
+    s3_uri: str,
+    role_arn: str,
+    s3_client: Any,
+    bedrock_control_client: Any,
+    job_name: str | None = None,
+    backoff: AdaptiveBackoff | None = None,
+) -> str:
+    """
+    Prepare and submit a Bedrock batch inference job. Returns the job ARN.
+
+    Retrieval still runs online (it is fast and cheap) with the same throttling
+    backoff as the run command; the model prompts are streamed to a local file,
+    uploaded to S3 and answered by a batch job. Questions without relevant context,
+    failed retrievals and invalid input lines are appended to the output once the
+    job has been created, so a failed submission can be rerun without duplicating
+    them. The submitted questions are uploaded next to the job input so
+    collect_batch can write them back with their answers.
+    """
+    backoff = backoff or AdaptiveBackoff()
+    bucket, prefix = _split_s3_uri(s3_uri)
+    job_name = job_name or f"bulk-qa-{int(time.time())}"
+    job_prefix = f"{prefix}/{job_name}".lstrip("/")
+    input_key = f"{job_prefix}/input/records.jsonl"
+    queries_key = _queries_key(input_key)
+    model_id = bedrock_client._get_bedrock_model_id()
+    if not model_id:
+        raise ValueError("BEDROCK_MODEL_ID is not configured")
+
+    records = 0
+    with (
+        tempfile.NamedTemporaryFile("w", suffix=".jsonl", encoding="utf-8") as batch_file,
+        tempfile.NamedTemporaryFile("w", suffix=".jsonl", encoding="utf-8") as queries_file,
+        tempfile.NamedTemporaryFile("w+", suffix=".jsonl", encoding="utf-8") as immediate_file,
+    ):
+        for _, record in read_questions(input_path):
+            if "error" in record:
+                immediate_file.write(json.dumps(record) + "\n")
+                continue
+            result = {"id": record["id"], "query": record["query"]}
+            try:
+                body = call_with_backoff(
+                    partial(bedrock_client.build_model_request_from_kb, record["query"]),
+                    record["id"],
+                    backoff,
+                )
+            except (RuntimeError, ValueError) as e:
+                result["error"] = str(e)
+                immediate_file.write(json.dumps(result) + "\n")
+                continue
+            if body is None:
+                result["answer"] = bedrock_client.NO_CONTEXT_ANSWER
+                immediate_file.write(json.dumps(result) + "\n")
+                continue
+            batch_file.write(json.dumps({"recordId": record["id"], "modelInput": body}) + "\n")
+            queries_file.write(json.dumps(result) + "\n")
+            records += 1
+        batch_file.flush()
+        queries_file.flush()
+
+        if not records:
+            raise ValueError("No questions with relevant context to submit")
+        s3_client.upload_file(batch_file.name, bucket, input_key)
+        s3_client.upload_file(queries_file.name, bucket, queries_key)
+
+        response = bedrock_control_client.create_model_invocation_job(
+            jobName=job_name,
+            roleArn=role_arn,
+            modelId=model_id,
+            inputDataConfig={"s3InputDataConfig": {"s3Uri": f"s3://{bucket}/{input_key}"}},
+            outputDataConfig={
+                "s3OutputDataConfig": {"s3Uri": f"s3://{bucket}/{job_prefix}/output/"}
+            },
+        )
+
+        immediate_file.seek(0)
+        with output_path.open("a", encoding="utf-8") as out:
+            shutil.copyfileobj(immediate_file, out)
+
+    logger.info(f"Submitted batch job {response['jobArn']} with {records} records")
+    return response["jobArn"]
+
+
+def _queries_key(input_key: str) -> str:
+    """S3 key of the submitted questions, stored outside the batch job input folder."""
+    return f"{input_key.rsplit('/input/', 1)[0]}/queries.jsonl"
+
+
+def collect_batch(
+    job_arn: str, output_path: Path, s3_client: Any, bedrock_control_client: Any
+) -> dict[str, Any]:
+    """
+    Append answers from a finished batch job to the output file.
+
+    Partially completed jobs are collected too; their failed records are written
+    as errors.
+    """
+    job = bedrock_control_client.get_model_invocation_job(jobIdentifier=job_arn)
+    if job["status"] not in BATCH_COMPLETED_STATUSES:
+        raise RuntimeError(f"Batch job {job_arn} is {job['status']}, not Completed")
+
+    input_bucket, input_key = _split_s3_uri(job["inputDataConfig"]["s3InputDataConfig"]["s3Uri"])
+    output_bucket, output_prefix = _split_s3_uri(
+        job["outputDataConfig"]["s3OutputDataConfig"]["s3Uri"]
+    )
+    job_id = job_arn.rsplit("/", 1)[-1]
+    output_key = f"{output_prefix}/{job_id}/{input_key.rsplit('/', 1)[-1]}.out".lstrip("/")
+
+    answered = failed = 0
+    with (
+        tempfile.NamedTemporaryFile(suffix=".jsonl") as queries_file,
+        tempfile.NamedTemporaryFile(suffix=".jsonl.out") as batch_output,
+        output_path.open("a", encoding="utf-8") as out,
+    ):
+        s3_client.download_file(input_bucket, _queries_key(input_key), queries_file.name)
+        with open(queries_file.name, encoding="utf-8") as f:
+            questions = (json.loads(line) for line in f if line.strip())
+            queries = {question["id"]: question["query"] for question in questions}
+
+        s3_client.download_file(output_bucket, output_key, batch_output.name)
+        with open(batch_output.name, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                result: dict[str, Any] = {
+                    "id": record["recordId"],
+                    "query": queries.get(record["recordId"], ""),
+                }
+                try:
+                    result["answer"] = bedrock_client.extract_nova_answer(record["modelOutput"])
+                    answered += 1
+                except KeyError:
+                    result["error"] = record.get("error", {}).get("errorMessage", "No answer")
+                    failed += 1
+                out.write(json.dumps(result) + "\n")
+
+    return {"answered": answered, "failed": failed}
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Answer questions with online calls")
+    run_parser.add_argument("--input", type=Path, required=True, help="Questions (JSONL)")
+    run_parser.add_argument("--output", type=Path, required=True, help="Answers (JSONL)")
+    run_parser.add_argument("--checkpoint", type=Path, help="Default: <output>.checkpoint")
+    run_parser.add_argument(
+        "--concurrency", type=_positive_int, default=4, help="Parallel questions"
+    )
+    run_parser.add_argument(
+        "--checkpoint-every", type=_positive_int, default=50, help="Questions between checkpoints"
+    )
+
+    submit_parser = subparsers.add_parser("batch-submit", help="Submit a batch inference job")
+    submit_parser.add_argument("--input", type=Path, required=True, help="Questions (JSONL)")
+    submit_parser.add_argument("--output", type=Path, required=True, help="Answers (JSONL)")
+    submit_parser.add_argument("--s3-uri", required=True, help="S3 prefix for job input/output")
+    submit_parser.add_argument("--role-arn", required=True, help="Batch inference service role")
+    submit_parser.add_argument("--job-name", help="Default: bulk-qa-<timestamp>")
+
+    collect_parser = subparsers.add_parser("batch-collect", help="Collect batch job answers")
+    collect_parser.add_argument("--job-arn", required=True, help="Batch inference job ARN")
+    collect_parser.add_argument("--output", type=Path, required=True, help="Answers (JSONL)")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    logging.getLogger(bedrock_client.__name__).setLevel(logging.WARNING)
+
+    try:
+        if args.command == "run":
+            checkpoint = args.checkpoint or args.output.with_name(args.output.name + ".checkpoint")
+            summary = run_online(
+                args.input,
+                args.output,
+                checkpoint,
+                concurrency=args.concurrency,
+                checkpoint_every=args.checkpoint_every,
+            )
+            print(
+                f"Processed {summary['processed']} questions "
+                f"({summary['answered']} answered, {summary['failed']} failed in total) "
+                f"at {summary['questions_per_minute']:.1f} questions/min"
+            )
+        else:
+            s3_client = boto3.client("s3")
+            bedrock_control_client = boto3.client("bedrock")
+            if args.command == "batch-submit":
+                job_arn = submit_batch(
+                    args.input,
+                    args.output,
+                    args.s3_uri,
+                    args.role_arn,
+                    s3_client,
+                    bedrock_control_client,
+                    args.job_name,
+                )
+                print(f"Submitted batch job: {job_arn}")
+            else:
+                summary = collect_batch(
+                    args.job_arn, args.output, s3_client, bedrock_control_client
+                )
+                print(f"Collected {summary['answered']} answers ({summary['failed']} failed)")
+    except (OSError, ValueError, RuntimeError, ClientError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
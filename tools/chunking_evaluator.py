@@ -0,0 +1,466 @@
+"""Offline chunking-strategy evaluator for the Bedrock Knowledge Base data source.
+
+Chunks the document corpus under several strategies, embeds every variant and
+measures retrieval recall on a golden question set together with the average
+number of context tokens per query and the resulting index size. The winning
+strategy is rendered as the ``vector_ingestion_configuration`` block of
+``aws_bedrockagent_data_source.s3_documents`` in terraform/bedrock.tf.
+
+Usage:
+    python tools/chunking_evaluator.py --corpus knowledge-base --golden golden.jsonl
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Protocol
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+TITAN_EMBEDDING_MODEL_ID = "amazon.titan-embed-text-v1"
+FLOAT32_BYTES = 4
+
+_TOKEN_PATTERN = re.compile(r"\S+")
+_SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count using whitespace-separated words."""
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _unit_vector(vector: list[float]) -> list[float]:
+    """Scale a vector to unit length so dot products are cosine similarities."""
+    norm = math.sqrt(sum(value * value for value in vector))
+    if norm == 0:
+        return vector
+    return [value / norm for value in vector]
+
+
+class Embedder(Protocol):
+    """Turns texts into vectors. Implementations must be deterministic per text."""
+
+    @property
+    def dimension(self) -> int: ...
+
+    def embed(self, texts: list[str]) -> list[list[float]]: ...
+
+
+class HashingEmbedder:
+    """Deterministic local stand-in for Titan embeddings using feature hashing."""
+
+    def __init__(self, dimension: int = 256):
+        self.dimension = dimension
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed_one(text) for text in texts]
+
+    def _embed_one(self, text: str) -> list[float]:
+        vector = [0.0] * self.dimension
+        for token in re.findall(r"\w+", text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "big") % self.dimension
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[bucket] += sign
+        return _unit_vector(vector)
+
+
+class BedrockEmbedder:
+    """
+    Embeds texts with the same Titan model the Knowledge Base uses.
+
+    The dimension depends on the model (1536 for Titan v1, 1024 for Titan v2), so
+    it is taken from the embeddings the model returns.
+    """
+
+    def __init__(self, model_id: str = TITAN_EMBEDDING_MODEL_ID, client: Any | None = None):
+        if client is None:
+            import boto3
+
+            client = boto3.client("bedrock-runtime")
+        self.model_id = model_id
+        self.client = client
+        self._dimension: int | None = None
+
+    @property
+    def dimension(self) -> int:
+        if self._dimension is None:
+            self.embed(["dimension probe"])
+        return self._dimension
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        vectors = []
+        for text in texts:
+            response = self.client.invoke_model(
+                modelId=self.model_id,
+                contentType="application/json",
+                accept="application/json",
+                body=json.dumps({"inputText": text}),
+            )
+            body = json.loads(response["body"].read().decode("utf-8"))
+            # Titan v1 vectors are not unit length; scoring assumes cosine like S3 Vectors
+            vectors.append(_unit_vector(body["embedding"]))
+            self._dimension = len(vectors[-1])
+        return vectors
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """A searchable chunk and the text handed to the model when it is retrieved."""
+
+    source: str
+    text: str
+    context: str
+
+
+def _windows(words: list[str], size: int, overlap: int) -> list[list[str]]:
+    step = max(size - overlap, 1)
+    windows = []
+    for start in range(0, len(words), step):
+        windows.append(words[start : start + size])
+        if start + size >= len(words):
+            break
+    return windows
+
+
+class FixedSizeStrategy:
+    """Fixed-size token windows with percentage overlap (Bedrock ``FIXED_SIZE``)."""
+
+    def __init__(self, max_tokens: int = 300, overlap_percentage: int = 20):
+        self.max_tokens = max_tokens
+        self.overlap_percentage = overlap_percentage
+
+    @property
+    def name(self) -> str:
+        return f"fixed-{self.max_tokens}-{self.overlap_percentage}pct"
+
+    def chunk(self, source: str, text: str, embedder: Embedder) -> list[Chunk]:
+        overlap = self.max_tokens * self.overlap_percentage // 100
+        chunks = []
+        for window in _windows(text.split(), self.max_tokens, overlap):
+            chunk_text = " ".join(window)
+            chunks.append(Chunk(source=source, text=chunk_text, context=chunk_text))
+        return chunks
+
+    def terraform_config(self) -> str:
+        return (
+            'chunking_strategy = "FIXED_SIZE"\n'
+            "fixed_size_chunking_configuration {\n"
+            f"  max_tokens         = {self.max_tokens}\n"
+            f"  overlap_percentage = {self.overlap_percentage}\n"
+            "}"
+        )
+
+
+class SemanticStrategy:
+    """Sentence grouping split at embedding-distance breakpoints (Bedrock ``SEMANTIC``)."""
+
+    def __init__(
+        self, max_tokens: int = 300, buffer_size: int = 0, breakpoint_percentile_threshold: int = 95
+    ):
+        self.max_tokens = max_tokens
+        self.buffer_size = buffer_size
+        self.breakpoint_percentile_threshold = breakpoint_percentile_threshold
+
+    @property
+    def name(self) -> str:
+        return f"semantic-{self.max_tokens}-p{self.breakpoint_percentile_threshold}"
+
+    def chunk(self, source: str, text: str, embedder: Embedder) -> list[Chunk]:
+        sentences = [s for s in _SENTENCE_PATTERN.split(" ".join(text.split())) if s]
+        if not sentences:
+            return []
+
+        # Each sentence is embedded together with its neighbours, as Bedrock does
+        windows = [
+            " ".join(sentences[max(i - self.buffer_size, 0) : i + self.buffer_size + 1])
+            for i in range(len(sentences))
+        ]
+        vectors = embedder.embed(windows)
+        distances = [
+            1.0 - sum(a * b for a, b in zip(vectors[i], vectors[i + 1], strict=True))
+            for i in range(len(vectors) - 1)
+        ]
+        threshold = _percentile(distances, self.breakpoint_percentile_threshold)
+
+        chunks = []
+        current: list[str] = []
+        current_tokens = 0
+        for index, sentence in enumerate(sentences):
+            sentence_tokens = count_tokens(sentence)
+            if current and current_tokens + sentence_tokens > self.max_tokens:
+                chunks.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(sentence)
+            current_tokens += sentence_tokens
+            if index < len(distances) and distances[index] >= threshold:
+                chunks.append(" ".join(current))
+                current, current_tokens = [], 0
+        if current:
+            chunks.append(" ".join(current))
+
+        return [Chunk(source=source, text=chunk, context=chunk) for chunk in chunks]
+
+    def terraform_config(self) -> str:
+        return (
+            'chunking_strategy = "SEMANTIC"\n'
+            "semantic_chunking_configuration {\n"
+            f"  breakpoint_percentile_threshold = {self.breakpoint_percentile_threshold}\n"
+            f"  buffer_size                     = {self.buffer_size}\n"
+            f"  max_token                       = {self.max_tokens}\n"
+            "}"
+        )
+
+
+def _percentile(values: list[float], percentile: int) -> float:
+    if not values:
+        return math.inf
+    ordered = sorted(values)
+    index = min(math.ceil(len(ordered) * percentile / 100) - 1, len(ordered) - 1)
+    return ordered[max(index, 0)]
+
+
+class HierarchicalStrategy:
+    """Child chunks are searched, parent chunks are returned (Bedrock ``HIERARCHICAL``)."""
+
+    def __init__(
+        self, parent_max_tokens: int = 1500, child_max_tokens: int = 300, overlap_tokens: int = 60
+    ):
+        self.parent_max_tokens = parent_max_tokens
+        self.child_max_tokens = child_max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    @property
+    def name(self) -> str:
+        return f"hierarchical-{self.parent_max_tokens}-{self.child_max_tokens}"
+
+    def chunk(self, source: str, text: str, embedder: Embedder) -> list[Chunk]:
+        chunks = []
+        for parent in _windows(text.split(), self.parent_max_tokens, 0):
+            parent_text = " ".join(parent)
+            for child in _windows(parent, self.child_max_tokens, self.overlap_tokens):
+                chunks.append(Chunk(source=source, text=" ".join(child), context=parent_text))
+        return chunks
+
+    def terraform_config(self) -> str:
+        return (
+            'chunking_strategy = "HIERARCHICAL"\n'
+            "hierarchical_chunking_configuration {\n"
+            "  level_configuration {\n"
+            f"    max_tokens = {self.parent_max_tokens}\n"
+            "  }\n"
+            "  level_configuration {\n"
+            f"    max_tokens = {self.child_max_tokens}\n"
+            "  }\n"
+            f"  overlap_tokens = {self.overlap_tokens}\n"
+            "}"
+        )
+
+
+def default_strategies() -> list[Any]:
+    """Strategy grid evaluated when no explicit list is given."""
+    return [
+        FixedSizeStrategy(max_tokens=200, overlap_percentage=20),
+        FixedSizeStrategy(max_tokens=300, overlap_percentage=20),
+        FixedSizeStrategy(max_tokens=500, overlap_percentage=10),
+        SemanticStrategy(max_tokens=300, buffer_size=0, breakpoint_percentile_threshold=95),
+        HierarchicalStrategy(parent_max_tokens=1500, child_max_tokens=300, overlap_tokens=60),
+    ]
+
+
+@dataclass(frozen=True)
+class StrategyReport:
+    """Evaluation results for a single chunking strategy."""
+
+    strategy: Any
+    recall: float
+    avg_context_tokens: float
+    chunk_count: int
+    index_bytes: int
+
+    @property
+    def name(self) -> str:
+        return self.strategy.name
+
+
+def load_corpus(corpus_path: Path) -> dict[str, str]:
+    """
+    Load PDF and plain-text documents from a file or directory into {name: text}.
+
+    Names are paths relative to a corpus directory (matching S3 keys when the
+    directory mirrors the bucket), or the file name for a single file.
+    """
+    is_dir = corpus_path.is_dir()
+    paths = sorted(corpus_path.rglob("*")) if is_dir else [corpus_path]
+    corpus = {}
+    for path in paths:
+        name = path.relative_to(corpus_path).as_posix() if is_dir else path.name
+        suffix = path.suffix.lower()
+        if suffix == ".pdf":
+            corpus[name] = _read_pdf(path)
+        elif suffix in {".txt", ".md"}:
+            corpus[name] = path.read_text(encoding="utf-8")
+
+    if not corpus:
+        raise ValueError(f"No .pdf, .txt or .md documents found in {corpus_path}")
+    return corpus
+
+
+def _read_pdf(path: Path) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise RuntimeError(
+            "Reading PDF documents requires pypdf. Install it with: uv sync --extra tools"
+        ) from e
+
+    reader = PdfReader(str(path))
+    return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def load_golden_set(golden_path: Path) -> list[dict[str, str]]:
+    """Load golden questions from JSONL with ``question`` and ``expected_text`` fields."""
+    golden = []
+    with golden_path.open(encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not record.get("question") or not record.get("expected_text"):
+                raise ValueError(
+                    f"{golden_path}:{line_number}: 'question' and 'expected_text' are required"
+                )
+            golden.append(record)
+
+    if not golden:
+        raise ValueError(f"Golden set {golden_path} is empty")
+    return golden
+
+
+def evaluate_strategy(
+    strategy: Any,
+    corpus: dict[str, str],
+    golden: list[dict[str, str]],
+    embedder: Embedder,
+    top_k: int = 5,
+) -> StrategyReport:
+    """Chunk, embed and score one strategy against the golden set."""
+    chunks = [
+        chunk for source, text in corpus.items() for chunk in strategy.chunk(source, text, embedder)
+    ]
+    vectors = embedder.embed([chunk.text for chunk in chunks])
+    question_vectors = embedder.embed([record["question"] for record in golden])
+
+    hits = 0
+    total_context_tokens = 0
+    for record, question_vector in zip(golden, question_vectors, strict=True):
+        scores = [sum(a * b for a, b in zip(question_vector, v, strict=True)) for v in vectors]
+        ranked = sorted(range(len(chunks)), key=lambda i: scores[i], reverse=True)[:top_k]
+
+        # Hierarchical children sharing a parent are returned to the model only once
+        contexts = list(dict.fromkeys(chunks[i].context for i in ranked))
+        total_context_tokens += sum(count_tokens(context) for context in contexts)
+
+        expected = _normalize(record["expected_text"])
+        if any(expected in _normalize(context) for context in contexts):
+            hits += 1
+
+    return StrategyReport(
+        strategy=strategy,
+        recall=hits / len(golden),
+        avg_context_tokens=total_context_tokens / len(golden),
+        chunk_count=len(chunks),
+        index_bytes=len(vectors) * embedder.dimension * FLOAT32_BYTES,
+    )
+
+
+def recommend(reports: list[StrategyReport], recall_tolerance: float = 0.05) -> StrategyReport:
+    """
+    Pick the strategy with the smallest prompt among those close to the best recall.
+
+    Strategies within ``recall_tolerance`` of the best recall are considered
+    equivalent for answer quality; fewer context tokens then means lower latency
+    and cost, with index size as the tie-breaker.
+    """
+    if not reports:
+        raise ValueError("No strategy reports to choose from")
+
+    best_recall = max(report.recall for report in reports)
+    candidates = [r for r in reports if r.recall >= best_recall - recall_tolerance]
+    return min(candidates, key=lambda r: (r.avg_context_tokens, r.index_bytes))
+
+
+def render_terraform(report: StrategyReport) -> str:
+    """Render the ``vector_ingestion_configuration`` block for the data source."""
+    config = "\n".join(f"    {line}" for line in report.strategy.terraform_config().splitlines())
+    return f"vector_ingestion_configuration {{\n  chunking_configuration {{\n{config}\n  }}\n}}"
+
+
+def format_reports(reports: list[StrategyReport]) -> str:
+    """Format evaluation results as a plain-text table."""
+    lines = [f"{'strategy':<28} {'recall':>7} {'ctx tokens':>11} {'chunks':>7} {'index KiB':>10}"]
+    for report in reports:
+        lines.append(
+            f"{report.name:<28} {report.recall:>7.2f} {report.avg_context_tokens:>11.1f} "
+            f"{report.chunk_count:>7} {report.index_bytes / 1024:>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, required=True, help="Document file or directory")
+    parser.add_argument("--golden", type=Path, required=True, help="Golden questions (JSONL)")
+    parser.add_argument("--top-k", type=int, default=5, help="Retrieved chunks per query")
+    parser.add_argument(
+        "--embedder",
+        choices=["hashing", "bedrock"],
+        default="hashing",
+        help="Embedding backend (hashing is a deterministic local stand-in)",
+    )
+    parser.add_argument(
+        "--recall-tolerance",
+        type=float,
+        default=0.05,
+        help="Recall drop accepted in exchange for smaller prompts",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        corpus = load_corpus(args.corpus)
+        golden = load_golden_set(args.golden)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    try:
+        embedder = BedrockEmbedder() if args.embedder == "bedrock" else HashingEmbedder()
+        reports = [
+            evaluate_strategy(strategy, corpus, golden, embedder, top_k=args.top_k)
+            for strategy in default_strategies()
+        ]
+    except (ClientError, BotoCoreError) as e:
+        print(f"Error: embedding with Bedrock failed: {e}", file=sys.stderr)
+        return 1
+    best = recommend(reports, recall_tolerance=args.recall_tolerance)
+
+    print(format_reports(reports))
+    print()
+    print(f"Recommended strategy: {best.name}")
+    print("Add to aws_bedrockagent_data_source.s3_documents in terraform/bedrock.tf:")
+    print()
+    print(render_terraform(best))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""Latency benchmark for the generation engines in bedrock_client.
+
+Replays a recorded Bedrock trace (see ``bedrock_recorder``) through
+``generate_answer_from_kb`` with the recorded per-call latencies, so the
+two-call ``retrieve_invoke`` engine can be compared with the single-call
+``retrieve_and_generate`` engine without AWS access. The trace must contain
+retrieve, invoke_model and retrieve_and_generate calls.
+
+Usage:
+    python tools/engine_benchmark.py --trace traces/
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import bedrock_client
+import bedrock_recorder
+from bedrock_recorder import TraceRecord, p95
+
+REQUIRED_OPERATIONS = ("retrieve", "invoke_model", "retrieve_and_generate")
+
+_BENCHMARK_ENV = {
+    "BEDROCK_KB_ID": "benchmark-kb",
+    "BEDROCK_MODEL_ID": "",
+    "GENERATION_ENGINE": "",
+    "DOCUMENT_ROUTING_TOP_K": "0",
+}
+
+
+def load_trace(trace_path: Path) -> list[TraceRecord]:
+    """Load a recorded trace and check every call type the engines make is present."""
+    records = bedrock_recorder.load_trace(trace_path)
+    recorded = {record.operation for record in records}
+    for operation in REQUIRED_OPERATIONS:
+        if operation not in recorded:
+            raise ValueError(f"{trace_path}: no '{operation}' calls recorded")
+    if not _recorded_model_id(records):
+        raise ValueError(f"{trace_path}: no answer 'invoke_model' calls recorded")
+    return records
+
+
+def _recorded_model_id(records: list[TraceRecord]) -> str:
+    """Model ID of the recorded answer calls, so replayed invoke_model calls match."""
+    return next(
+        (
+            record.params["modelId"]
+            for record in records
+            if record.operation == "invoke_model" and "messages" in record.params.get("body", {})
+        ),
+        "",
+    )
+
+
+def run_engine(
+    engine: str,
+    records: list[TraceRecord],
+    queries: int,
+    sleep: Callable[[float], None] = time.sleep,
+    clock: Callable[[], float] = time.perf_counter,
+    time_scale: float = 1.0,
+) -> list[float]:
+    """Run queries through one engine with replayed clients. Returns latencies in seconds."""
+    saved_env = {key: os.environ.get(key) for key in _BENCHMARK_ENV}
+    saved_clients = (
+        bedrock_client._bedrock_agent_runtime_client,
+        bedrock_client._bedrock_runtime_client,
+    )
+
+    os.environ.update(
+        _BENCHMARK_ENV, BEDROCK_MODEL_ID=_recorded_model_id(records), GENERATION_ENGINE=engine
+    )
+    (
+        bedrock_client._bedrock_agent_runtime_client,
+        bedrock_client._bedrock_runtime_client,
+    ) = bedrock_recorder.build_replay_clients(
+        records, replay_timings=True, time_scale=time_scale, sleep=sleep
+    )
+
+    try:
+        latencies = []
+        for index in range(queries):
+            start = clock()
+            bedrock_client.generate_answer_from_kb(f"Benchmark question {index}?")
+            latencies.append(clock() - start)
+        return latencies
+    finally:
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        (
+            bedrock_client._bedrock_agent_runtime_client,
+            bedrock_client._bedrock_runtime_client,
+        ) = saved_clients
+
+
+def summarize(latencies: list[float]) -> dict[str, float]:
+    """Summarize latencies in milliseconds."""
+    return {
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": p95(latencies) * 1000,
+    }
+
+
+def format_summary(results: dict[str, dict[str, float]]) -> str:
+    """Format per-engine summaries as a plain-text table with relative speedup."""
+    baseline = results[bedrock_client.ENGINE_RETRIEVE_INVOKE]["mean_ms"]
+    lines = [f"{'engine':<24} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'speedup':>8}"]
+    for engine, summary in results.items():
+        speedup = baseline / summary["mean_ms"] if summary["mean_ms"] else float("inf")
+        lines.append(
+            f"{engine:<24} {summary['mean_ms']:>9.1f} {summary['p50_ms']:>9.1f} "
+            f"{summary['p95_ms']:>9.1f} {speedup:>7.2f}x"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--trace", type=Path, required=True, help="Recorded Bedrock trace (JSONL file or directory)"
+    )
+    parser.add_argument("--queries", type=int, default=20, help="Queries per engine")
+    parser.add_argument(
+        "--time-scale",
+        type=float,
+        default=1.0,
+        help="Multiplier applied to recorded latencies (e.g. 0.1 for a quick run)",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        records = load_trace(args.trace)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    logging.getLogger(bedrock_client.__name__).setLevel(logging.WARNING)
+    results = {
+        engine: summarize(run_engine(engine, records, args.queries, time_scale=args.time_scale))
+        for engine in bedrock_client.GENERATION_ENGINES
+    }
+    print(format_summary(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""Record a synthetic, production-shaped Bedrock trace for the perf suite.
+
+Runs questions through ``generate_answer_from_kb`` with both generation engines,
+using stand-in Bedrock clients wrapped in ``bedrock_recorder.RecordingClient``.
+The trace therefore carries exactly the request parameters, response format and
+redaction of a real recording, while response sizes and latencies come from a
+seeded generator modelled on production traffic. Regenerate
+tests/perf/traces/production_shaped.jsonl with it whenever the requests the
+function sends to Bedrock change.
+
+Usage:
+    PYTHONPATH=lambda python tools/record_synthetic_trace.py \\
+        --output tests/perf/traces/production_shaped.jsonl
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import sys
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import patch
+
+import bedrock_client
+from bedrock_recorder import (
+    AGENT_RUNTIME_SERVICE,
+    RUNTIME_SERVICE,
+    RecordingClient,
+    TraceRecord,
+)
+
+DEFAULT_SEED = 20250101
+KNOWLEDGE_BASE_ID = "KBTRACE001"
+MODEL_ID = "amazon.nova-micro-v1:0"
+SOURCE_URI = (
+    "s3://knowledge-assistant-documents-20250101/wellarchitected-serverless-applications-lens.pdf"
+)
+
+# Latency ranges (ms) observed for each call in production
+LATENCY_MS = {
+    "retrieve": (170.0, 310.0),
+    "invoke_model": (790.0, 1310.0),
+    "retrieve_and_generate": (1170.0, 2200.0),
+}
+CHUNK_CHARS = (1100, 1700)
+ANSWER_CHARS = (400, 900)
+
+SENTENCES = [
+    "Lambda functions scale automatically with the number of incoming requests.",
+    "Cold starts add latency when a new execution environment is initialized.",
+    "Provisioned concurrency keeps execution environments initialized and ready.",
+    "Right-size memory because CPU allocation scales with configured memory.",
+    "API Gateway throttles requests that exceed the configured rate and burst limits.",
+    "Amazon SQS decouples producers and consumers and buffers traffic spikes.",
+    "Idempotent handlers make retries safe when events are delivered more than once.",
+    "Use dead-letter queues to capture events that repeatedly fail processing.",
+    "Step Functions coordinate multiple services into serverless workflows.",
+    "DynamoDB on-demand capacity removes the need for capacity planning.",
+    "Least-privilege IAM policies limit the blast radius of a compromised function.",
+    "Structured logging and tracing make distributed workflows observable.",
+]
+
+QUESTIONS = [
+    "How should I handle cold starts in Lambda?",
+    "What is provisioned concurrency?",
+    "How do I make event processing idempotent?",
+    "When should I put an SQS queue in front of a Lambda function?",
+    "How does API Gateway throttling protect my backend?",
+    "What memory size should I configure for a CPU-bound function?",
+    "How can I trace requests across a serverless workflow?",
+    "What are the security best practices for Lambda execution roles?",
+]
+
+
+class SimulatedClock:
+    """Clock advanced by the stand-in clients instead of real time."""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def __call__(self) -> float:
+        return self.seconds
+
+
+class StandInBedrockClient:
+    """Answers Bedrock calls with production-shaped responses and simulated latency."""
+
+    def __init__(self, rng: random.Random, clock: SimulatedClock):
+        self.meta = SimpleNamespace(region_name="us-east-1")
+        self._rng = rng
+        self._clock = clock
+
+    def retrieve(self, **kwargs: Any) -> dict[str, Any]:
+        self._elapse("retrieve")
+        results = self._references(kwargs["retrievalConfiguration"])
+        return {"retrievalResults": results, "guardrailAction": "NONE"}
+
+    def invoke_model(self, **kwargs: Any) -> dict[str, Any]:
+        self._elapse("invoke_model")
+        prompt = json.loads(kwargs["body"])["messages"][0]["content"][0]["text"]
+        answer = self._passage(*ANSWER_CHARS)
+        body = {
+            "output": {"message": {"content": [{"text": answer}], "role": "assistant"}},
+            "stopReason": "end_turn",
+            "usage": {
+                "inputTokens": len(prompt) // 4,
+                "outputTokens": len(answer) // 4,
+                "totalTokens": (len(prompt) + len(answer)) // 4,
+            },
+        }
+        return {
+            "body": io.BytesIO(json.dumps(body).encode("utf-8")),
+            "contentType": "application/json",
+        }
+
+    def retrieve_and_generate(self, **kwargs: Any) -> dict[str, Any]:
+        self._elapse("retrieve_and_generate")
+        kb_config = kwargs["retrieveAndGenerateConfiguration"]["knowledgeBaseConfiguration"]
+        answer = self._passage(*ANSWER_CHARS)
+        return {
+            "output": {"text": answer},
+            "sessionId": str(uuid.UUID(int=self._rng.getrandbits(128))),
+            "citations": [
+                {
+                    "generatedResponsePart": {
+                        "textResponsePart": {
+                            "text": answer,
+                            "span": {"start": 0, "end": len(answer) - 1},
+                        }
+                    },
+                    "retrievedReferences": self._references(kb_config["retrievalConfiguration"]),
+                }
+            ],
+        }
+
+    def _elapse(self, operation: str) -> None:
+        self._clock.seconds += round(self._rng.uniform(*LATENCY_MS[operation]), 1) / 1000
+
+    def _passage(self, min_chars: int, max_chars: int) -> str:
+        target = self._rng.randint(min_chars, max_chars)
+        sentences: list[str] = []
+        while sum(len(sentence) + 1 for sentence in sentences) < target:
+            sentences.append(self._rng.choice(SENTENCES))
+        return " ".join(sentences)
+
+    def _references(self, retrieval_configuration: dict[str, Any]) -> list[dict[str, Any]]:
+        count = retrieval_configuration["vectorSearchConfiguration"]["numberOfResults"]
+        scores = sorted((self._rng.uniform(0.55, 0.85) for _ in range(count)), reverse=True)
+        return [
+            {
+                "content": {"text": self._passage(*CHUNK_CHARS), "type": "TEXT"},
+                "location": {"type": "S3", "s3Location": {"uri": SOURCE_URI}},
+                "metadata": {
+                    "x-amz-bedrock-kb-source-uri": SOURCE_URI,
+                    "x-amz-bedrock-kb-document-page-number": float(self._rng.randint(1, 90)),
+                    "x-amz-bedrock-kb-chunk-id": f"1%3A0%3A{self._rng.getrandbits(32):08x}",
+                    "x-amz-bedrock-kb-data-source-id": "ABCDEFGHIJ",
+                },
+                "score": round(score, 6),
+            }
+            for score in scores
+        ]
+
+
+class TraceFileWriter:
+    """Writes trace records to one given JSONL file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.write_text("", encoding="utf-8")
+
+    def write(self, record: TraceRecord) -> None:
+        with self.path.open("a", encoding="utf-8") as trace_file:
+            trace_file.write(record.model_dump_json(exclude_none=True) + "\n")
+
+
+def record_trace(
+    output_path: Path, questions: int = len(QUESTIONS), seed: int = DEFAULT_SEED
+) -> int:
+    """Record questions through both generation engines. Returns the number of records."""
+    rng = random.Random(seed)
+    clock = SimulatedClock()
+    writer = TraceFileWriter(output_path)
+    stand_in = StandInBedrockClient(rng, clock)
+    clients = (
+        RecordingClient(stand_in, AGENT_RUNTIME_SERVICE, writer, clock=clock),
+        RecordingClient(stand_in, RUNTIME_SERVICE, writer, clock=clock),
+    )
+    saved_clients = (
+        bedrock_client._bedrock_agent_runtime_client,
+        bedrock_client._bedrock_runtime_client,
+    )
+    environment = {
+        "BEDROCK_KB_ID": KNOWLEDGE_BASE_ID,
+        "BEDROCK_MODEL_ID": MODEL_ID,
+        "BEDROCK_TRACE_DIR": "",
+        "DOCUMENT_ROUTING_TOP_K": "0",
+    }
+
+    (
+        bedrock_client._bedrock_agent_runtime_client,
+        bedrock_client._bedrock_runtime_client,
+    ) = clients
+    try:
+        for engine in bedrock_client.GENERATION_ENGINES:
+            with patch.dict(os.environ, environment, GENERATION_ENGINE=engine):
+                for question in (QUESTIONS * questions)[:questions]:
+                    bedrock_client.generate_answer_from_kb(question)
+    finally:
+        (
+            bedrock_client._bedrock_agent_runtime_client,
+            bedrock_client._bedrock_runtime_client,
+        ) = saved_clients
+
+    with output_path.open(encoding="utf-8") as trace_file:
+        return sum(1 for line in trace_file if line.strip())
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", type=Path, required=True, help="Trace file (JSONL)")
+    parser.add_argument(
+        "--questions", type=int, default=len(QUESTIONS), help="Questions per generation engine"
+    )
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Random seed")
+    args = parser.parse_args(argv)
+
+    logging.getLogger(bedrock_client.__name__).setLevel(logging.WARNING)
+    try:
+        count = record_trace(args.output, args.questions, args.seed)
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Wrote {count} trace records to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())